@@ -0,0 +1,217 @@
+"""
+Build every event-loop notes document in one go
+
+Loads the DOCUMENT content of each notes script (notes-*.py next to this
+file by default) and renders it to every format asked for: .docx, and
+with --format md / html (doc_formats.py) the same notes as Markdown or a
+standalone HTML page. Each document and format is one job; the jobs run
+in a process pool (--jobs), so the build takes about as long as the
+slowest of them. Every worker sets up one DocEngine - python-docx, lxml
+and the styles - and reuses it for all its .docx jobs. Files are written
+under a temporary name and renamed into place, so a half-written output
+is never seen.
+
+--incremental only renders the sections that changed since the last build
+and leaves a document alone when nothing did (see doc_cache.py); those
+.docx jobs run in this process, next to the pool.
+--timestamp (or SOURCE_DATE_EPOCH) fixes the time written into the
+documents, so the same content gives byte-identical files.
+Every .docx line reports the size and element count of its document.xml,
+and the run properties (direct formatting) if there are any.
+--backend stream writes document.xml straight into the archive
+(doc_stream.py) instead of building a python-docx tree first; use it for
+very long documents.
+
+--markdown renders the Markdown docs instead - every .md under docs/, or
+the .md files and directories given - into docs-docx/ unless -o says
+otherwise (doc_markdown.py). The parsed blocks of every file are cached
+under the cache directory, so a rebuild only parses the files that
+changed. A Markdown output is never written over its source.
+
+Usage:
+    python build_docs.py                      # every notes-*.py, into .
+    python build_docs.py notes-by-quen-ai.py -o out/
+    python build_docs.py --format all -o out/ # docx, md and html
+    python build_docs.py --incremental --timestamp 2025-12-16T00:00:00
+    python build_docs.py --backend stream
+    python build_docs.py --markdown -f all
+    python build_docs.py ../../docs/streams/1streams.md
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import doc_cache
+import doc_formats
+import doc_markdown
+import doc_stream
+from doc_engine import (DocEngine, document_stats, fixed_timestamp,
+                        load_content)
+
+CACHE_DIR = ".doc-cache"
+MARKDOWN_OUTPUT_DIR = "docs-docx"
+BACKENDS = ("docx", "stream")
+FORMATS = ("docx", "md", "html")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+_engine = None   # of this process, for the .docx jobs
+
+
+def notes_scripts():
+    return sorted(glob.glob(os.path.join(HERE, "notes-*.py")))
+
+
+def stats_note(path):
+    size, elements, run_properties = document_stats(path)
+    note = f"document.xml {size:,} bytes, {elements:,} elements, "
+    if run_properties:
+        note += f"{run_properties:,} run properties, "
+    return note
+
+
+def load_source(source, cache_dir):
+    """(content, note) of a notes script or a Markdown file."""
+    if not source.endswith(".md"):
+        return load_content(source), ""
+    cache = doc_markdown.MarkdownCache(cache_dir)
+    content, how = doc_markdown.load_markdown(source, cache)
+    return content, f"{how}, "
+
+
+def render_job(source, fmt, output_dir, backend, timestamp, cache_dir):
+    """Render one source to one format; returns (path, note, seconds)."""
+    global _engine
+    t = time.perf_counter()
+    content, note = load_source(source, cache_dir)
+    if fmt != "docx":
+        path = doc_formats.output_path(content, fmt, output_dir)
+        if os.path.abspath(path) == os.path.abspath(source):
+            raise ValueError(f"{path} would overwrite its source")
+        path = doc_formats.render(content, fmt, output_dir, timestamp)
+    else:
+        if _engine is None:
+            _engine = DocEngine(timestamp)
+        if backend == "stream":
+            path = doc_stream.render(_engine, content, output_dir)
+        else:
+            path = _engine.render(content, output_dir)
+        note += stats_note(path)
+    return path, note, time.perf_counter() - t
+
+
+def incremental_job(engine, cache, source, output_dir, cache_dir):
+    t = time.perf_counter()
+    content, note = load_source(source, cache_dir)
+    path, written, rendered, total = doc_cache.build(
+        engine, cache, content, output_dir)
+    note += f"{rendered} of {total} sections rendered, " \
+        if written else "unchanged, "
+    return path, note + stats_note(path), time.perf_counter() - t
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Render the event-loop notes documents, in parallel.")
+    parser.add_argument("notes", nargs="*",
+                        help="notes scripts with a DOCUMENT, or Markdown "
+                             "files (default: every notes-*.py here)")
+    parser.add_argument("--markdown", action="store_true",
+                        help="render the Markdown docs: every .md under "
+                             "docs/, or in the directories given")
+    parser.add_argument("-o", "--output-dir",
+                        help=f"directory for the documents (default ., "
+                             f"{MARKDOWN_OUTPUT_DIR} with --markdown)")
+    parser.add_argument("-f", "--format", action="append",
+                        choices=FORMATS + ("all",),
+                        help="output format, may be repeated (default docx)")
+    parser.add_argument("-j", "--jobs", type=int,
+                        help="worker processes (default: one per job, up to "
+                             "the CPU count; 1 renders in this process)")
+    parser.add_argument("--backend", choices=BACKENDS, default="docx",
+                        help="python-docx tree, or streaming writer "
+                             "(default docx)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="reuse unchanged sections, skip unchanged "
+                             "documents")
+    parser.add_argument("--cache-dir",
+                        help=f"cache for --incremental and the parsed "
+                             f"Markdown (default OUTPUT_DIR/{CACHE_DIR})")
+    parser.add_argument("--timestamp",
+                        help="ISO date and time to put into the documents "
+                             "instead of now (default: SOURCE_DATE_EPOCH)")
+    args = parser.parse_args(argv)
+
+    try:
+        timestamp = datetime.fromisoformat(args.timestamp) \
+            if args.timestamp else fixed_timestamp()
+    except ValueError:
+        parser.error(f"bad --timestamp {args.timestamp!r}")
+    if timestamp is not None and timestamp.year < 1980:
+        parser.error("the timestamp must be in 1980 or later (zip dates)")
+    if args.incremental and args.backend != "docx":
+        parser.error("--incremental needs --backend docx")
+    if args.jobs is not None and args.jobs < 1:
+        parser.error("--jobs must be at least 1")
+    wanted = args.format or ["docx"]
+    formats = [fmt for fmt in FORMATS if fmt in wanted or "all" in wanted]
+
+    output_dir = args.output_dir or (MARKDOWN_OUTPUT_DIR if args.markdown
+                                     else ".")
+    cache_dir = args.cache_dir or os.path.join(output_dir, CACHE_DIR)
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+    scripts = doc_markdown.markdown_sources(args.notes) if args.markdown \
+        else args.notes or notes_scripts()
+    local = [script for script in scripts
+             if args.incremental and "docx" in formats]
+    jobs = [(script, fmt) for script in scripts for fmt in formats
+            if not (fmt == "docx" and script in local)]
+    workers = min(args.jobs or os.cpu_count() or 1, len(jobs))
+    failed = 0
+
+    def report(script, fmt, run):
+        nonlocal failed
+        try:
+            path, note, seconds = run()
+        except Exception as e:
+            print(f"❌ {os.path.basename(script)} [{fmt}]: {e}")
+            failed += 1
+            return
+        print(f"✅ {path} ({note}{seconds:.3f} s)")
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        futures = [(script, fmt, pool.submit(
+            render_job, script, fmt, output_dir, args.backend, timestamp,
+            cache_dir)) for script, fmt in jobs] if pool else []
+        if local:
+            engine = DocEngine(timestamp)
+            cache = doc_cache.DocCache(cache_dir)
+            for script in local:
+                report(script, "docx", lambda: incremental_job(
+                    engine, cache, script, output_dir, cache_dir))
+            cache.save()
+        if pool is None:
+            for script, fmt in jobs:
+                report(script, fmt, lambda: render_job(
+                    script, fmt, output_dir, args.backend, timestamp,
+                    cache_dir))
+        for script, fmt, future in futures:
+            report(script, fmt, future.result)
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    print(f"done in {time.perf_counter() - started:.3f} s "
+          f"({len(jobs) + len(local)} jobs, {max(workers, 1)} processes)")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+Incremental builds of the notes documents (build_docs.py --incremental)
+
+Every section of a document (doc_engine.sections()) is keyed by a hash of
+its blocks and the renderer version; its rendered body XML is kept in the
+cache as fragments/<key>.xml. A build renders only the sections whose key
+is new and splices the cached fragments in for the rest.
+
+The document key covers the section keys, the properties and the fixed
+timestamp. manifest.json records it for every output together with the
+size and mtime of the file written; when both still match, the build
+writes nothing at all. A section with a timestamp block is keyed by the
+text it would show, so without a fixed timestamp it is rendered every
+time - and the document always written.
+
+Fragments no output refers to any more are removed after each build.
+"""
+
+import hashlib
+import json
+import os
+
+from doc_engine import RENDERER, atomic_output, sections
+
+MANIFEST = "manifest.json"
+
+
+def digest(value):
+    text = json.dumps(value, sort_keys=True, separators=(",", ":"),
+                      ensure_ascii=False)
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class DocCache:
+    """The cache directory: fragments/ and manifest.json."""
+
+    def __init__(self, root):
+        self.root = root
+        self.fragments = os.path.join(root, "fragments")
+        os.makedirs(self.fragments, exist_ok=True)
+        try:
+            with open(os.path.join(root, MANIFEST), encoding="utf-8") as f:
+                self.manifest = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.manifest = {}
+
+    def _fragment_path(self, key):
+        return os.path.join(self.fragments, key + ".xml")
+
+    def fragment(self, key):
+        try:
+            with open(self._fragment_path(key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def store_fragment(self, key, data):
+        with atomic_output(self._fragment_path(key)) as tmp:
+            with open(tmp, "wb") as f:
+                f.write(data)
+
+    def unchanged(self, path, key):
+        """Whether path is the file a build with this key wrote."""
+        entry = self.manifest.get(os.path.abspath(path))
+        if not entry or entry["key"] != key:
+            return False
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            return False
+        return (st.st_size, st.st_mtime_ns) == (entry["size"],
+                                                 entry["mtime_ns"])
+
+    def record(self, path, key, section_keys):
+        st = os.stat(path)
+        self.manifest[os.path.abspath(path)] = {
+            "key": key, "sections": section_keys,
+            "size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+    def save(self):
+        """Write the manifest and drop fragments no output uses."""
+        tmp = os.path.join(self.root, f"{MANIFEST}.tmp-{os.getpid()}")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, indent=2, sort_keys=True)
+            f.write("\n")
+        os.replace(tmp, os.path.join(self.root, MANIFEST))
+        used = {key for entry in self.manifest.values()
+                for key in entry["sections"]}
+        for name in os.listdir(self.fragments):
+            if name.endswith(".xml") and name[:-4] not in used:
+                os.remove(os.path.join(self.fragments, name))
+
+
+def section_key(engine, blocks):
+    # a timestamp block counts with the text it renders to
+    stamps = [engine.stamp(block[1]) for block in blocks
+              if block[0] == "timestamp"]
+    return digest([RENDERER, blocks, stamps])
+
+
+def build(engine, cache, content, directory=None):
+    """Render content incrementally; returns (path, whether it was
+    written, sections rendered, sections in the document)."""
+    path = os.path.join(directory or "", content["file"])
+    parts = sections(content["blocks"])
+    keys = [section_key(engine, blocks) for blocks in parts]
+    timestamp = engine.timestamp.isoformat() if engine.timestamp else None
+    key = digest([RENDERER, content.get("properties", {}), keys, timestamp])
+    if cache.unchanged(path, key):
+        return path, False, 0, len(parts)
+
+    fragments = []
+    rendered = 0
+    for blocks, section in zip(parts, keys):
+        fragment = cache.fragment(section)
+        if fragment is None:
+            fragment = engine.fragment(blocks)
+            cache.store_fragment(section, fragment)
+            rendered += 1
+        fragments.append(fragment)
+    engine.save(engine.assemble(content, fragments), path)
+    cache.record(path, key, keys)
+    return path, True, rendered, len(parts)
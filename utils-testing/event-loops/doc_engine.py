@@ -0,0 +1,402 @@
+"""
+Shared rendering engine for the event-loop notes
+
+The notes scripts (notes-by-deepSeek-ai.py, notes-by-quen-ai.py) hold their
+content as data: a DOCUMENT dict with the output file name, the core
+properties and a flat list of blocks,
+
+    ("title", text)                     level 0 heading, centred
+    ("heading", text, level)
+    ("paragraph", text, style, align)   style None is Normal; align None
+                                        or "center"
+    ("list", style, items)              a paragraph per item, e.g. in the
+                                        'List Bullet' style
+    ("rich", spans, style)              a paragraph of (text, character
+                                        style) runs, e.g. ("x", "Strong")
+    ("code", text)                      code listing in the 'Code' style
+    ("diagram", text)                   ASCII diagram, rendered like code
+    ("timestamp", format, align)        strftime format, filled in with the
+                                        time of the render
+    ("page_break",)
+
+built with the constructors below (heading(), bullets(), code(), ...).
+Blocks are plain tuples, so content can be hashed, pickled and compared.
+
+DocEngine builds the python-docx template - the default document plus the
+styles the blocks need - once and keeps it as bytes; every document starts
+from a copy. Rendering many documents in one process pays the python-docx
+and lxml start-up and the style setup a single time:
+
+    engine = DocEngine()
+    for content in contents:
+        engine.render(content)
+
+A document can also be put together from fragments: the serialized body
+XML of its sections (see sections()), rendered separately. doc_cache.py
+keeps those to rebuild only the sections that changed.
+
+Output is reproducible with a fixed timestamp (DocEngine(timestamp=...),
+or SOURCE_DATE_EPOCH for the notes scripts): it fills in the timestamp
+blocks, the created/modified properties and the dates of the zip entries,
+which python-docx otherwise sets to the time of the save.
+
+Styles are referenced by id: the StyleRegistry reads the template's
+styles once, where python-docx would look every style name up again in
+styles.xml - a scan of all of them - for each paragraph. Formatting lives
+in the styles (the 'Code' style of add_code_style()), never on the runs;
+document_stats() reports the size of the document.xml that comes out.
+
+Files are written under a temporary name and renamed into place
+(atomic_output()), so a reader never sees half a document.
+"""
+
+import os
+import runpy
+import zipfile
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from io import BytesIO
+
+import docx
+from docx import Document
+from docx.enum.style import WD_STYLE_TYPE
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml.ns import qn
+from docx.shared import Inches, Pt, RGBColor
+from lxml import etree
+
+RENDERER_VERSION = 3   # bump when the output of a block changes
+RENDERER = f"doc_engine {RENDERER_VERSION} python-docx {docx.__version__}"
+ALIGNMENTS = {None: None, "center": WD_ALIGN_PARAGRAPH.CENTER}
+PROPERTIES = ("title", "author", "subject", "keywords", "comments")
+_RPR = qn("w:rPr")
+_RSTYLE = qn("w:rStyle")
+
+
+# content constructors
+
+def title(text):
+    return ("title", text)
+
+
+def heading(text, level=1):
+    return ("heading", text, level)
+
+
+def paragraph(text="", style=None, align=None):
+    return ("paragraph", text, style, align)
+
+
+def bullets(items, style="List Bullet"):
+    return ("list", style, tuple(items))
+
+
+def rich(spans, style=None):
+    """spans: (text, character style or None) pairs."""
+    return ("rich", tuple(spans), style)
+
+
+def code(text):
+    return ("code", text)
+
+
+def diagram(text):
+    return ("diagram", text)
+
+
+def timestamp(fmt, align=None):
+    return ("timestamp", fmt, align)
+
+
+def page_break():
+    return ("page_break",)
+
+
+def sections(blocks):
+    """Split blocks at every level 1 heading; the first section holds
+    what comes before the first one (the title page)."""
+    current = []
+    found = [current]
+    for block in blocks:
+        if block[0] == "heading" and block[2] == 1 and current:
+            current = []
+            found.append(current)
+        current.append(block)
+    return found
+
+
+def fixed_timestamp():
+    """The time of SOURCE_DATE_EPOCH, if set, for reproducible builds."""
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    return datetime.fromtimestamp(int(epoch), timezone.utc) if epoch \
+        else None
+
+
+def format_time(fmt, when=None):
+    """strftime of when, or of now."""
+    return (when or datetime.now()).strftime(fmt)
+
+
+@contextmanager
+def atomic_output(path):
+    """A temporary name next to path to write to; renamed to path when
+    the block ends, removed if it fails."""
+    tmp = f"{path}.tmp-{os.getpid()}"
+    try:
+        yield tmp
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def fixed_zip(data, date_time):
+    """data, a zip archive, with every entry dated date_time."""
+    out = BytesIO()
+    with zipfile.ZipFile(BytesIO(data)) as zin, \
+            zipfile.ZipFile(out, "w", zipfile.ZIP_DEFLATED) as zout:
+        for item in zin.infolist():
+            info = zipfile.ZipInfo(item.filename, date_time)
+            info.compress_type = zipfile.ZIP_DEFLATED
+            info.create_system = 3
+            info.external_attr = 0o644 << 16
+            zout.writestr(info, zin.read(item))
+    return out.getvalue()
+
+
+def document_stats(path):
+    """(bytes, elements, run properties) of word/document.xml in a .docx;
+    run properties (w:rPr) with more than a character style are direct
+    formatting on the text."""
+    elements = run_properties = 0
+    with zipfile.ZipFile(path) as z:
+        size = z.getinfo("word/document.xml").file_size
+        with z.open("word/document.xml") as f:
+            for _, element in etree.iterparse(f):
+                elements += 1
+                if element.tag == _RPR and any(
+                        child.tag != _RSTYLE for child in element):
+                    run_properties += 1
+                element.clear()
+    return size, elements, run_properties
+
+
+# rendering
+
+def add_code_style(doc):
+    """The 'Code' paragraph style for code blocks and ASCII diagrams, and
+    the 'Code Char' character style for code within a line."""
+    code_style = doc.styles.add_style('Code', WD_STYLE_TYPE.PARAGRAPH)
+
+    font = code_style.font
+    font.name = 'Consolas'
+    font.size = Pt(10)
+    font.bold = False
+    font.color.rgb = RGBColor(0x00, 0x00, 0x00)
+
+    paragraph_format = code_style.paragraph_format
+    paragraph_format.left_indent = Inches(0.25)
+    paragraph_format.space_before = Pt(6)
+    paragraph_format.space_after = Pt(6)
+
+    char_style = doc.styles.add_style('Code Char', WD_STYLE_TYPE.CHARACTER)
+    char_style.font.name = 'Consolas'
+    char_style.font.size = Pt(10)
+
+
+class StyleRegistry:
+    """The style ids of a document by style type and name, read once."""
+
+    def __init__(self, doc):
+        self.ids = {(style.type, style.name): style.style_id
+                    for style in doc.styles}
+        self.defaults = {}
+        for kind in (WD_STYLE_TYPE.PARAGRAPH, WD_STYLE_TYPE.CHARACTER):
+            default = doc.styles.default(kind)
+            self.defaults[kind] = default.name if default is not None \
+                else None
+
+    def id(self, name, kind=WD_STYLE_TYPE.PARAGRAPH):
+        """The id of a paragraph (or character) style; None for the
+        default style, which python-docx leaves out as well."""
+        if name is None or name == self.defaults[kind]:
+            return None
+        try:
+            return self.ids[kind, name]
+        except KeyError:
+            raise KeyError(f"no style with name '{name}'") from None
+
+
+class DocEngine:
+    """Renders content dicts to .docx files from one prebuilt template."""
+
+    def __init__(self, timestamp=None):
+        self.timestamp = timestamp   # None: the time of each render
+        doc = Document()
+        add_code_style(doc)
+        buffer = BytesIO()
+        doc.save(buffer)
+        self.template = buffer.getvalue()
+        self.styles = StyleRegistry(doc)
+        self._parts = None
+        self.renderers = {
+            "title": self._title,
+            "heading": self._heading,
+            "paragraph": self._paragraph,
+            "list": self._list,
+            "rich": self._rich,
+            "code": self._code,
+            "diagram": self._code,
+            "timestamp": self._timestamp,
+            "page_break": self._page_break,
+        }
+
+    def new_document(self):
+        return Document(BytesIO(self.template))
+
+    # for writers that do not go through python-docx (doc_stream.py)
+
+    def template_parts(self):
+        """[(zip member name, bytes)] of the template, in order."""
+        if self._parts is None:
+            with zipfile.ZipFile(BytesIO(self.template)) as z:
+                self._parts = [(name, z.read(name)) for name in z.namelist()]
+        return self._parts
+
+    def document_frame(self):
+        """word/document.xml of the template split around the body
+        content: (everything up to <w:body>, the sectPr and the end)."""
+        xml = dict(self.template_parts())["word/document.xml"].decode()
+        start = xml.index("<w:body>") + len("<w:body>")
+        assert xml.startswith("<w:sectPr", start), "template body not empty"
+        return xml[:start], xml[start:]
+
+    def style_id(self, name, kind=WD_STYLE_TYPE.PARAGRAPH):
+        return self.styles.id(name, kind)
+
+    def core_properties(self, properties):
+        """docProps/core.xml for the given properties."""
+        doc = self.new_content_document({"properties": properties})
+        for part in doc.part.package.iter_parts():
+            if part.partname == "/docProps/core.xml":
+                return part.blob
+        raise LookupError("no core properties part")
+
+    def new_content_document(self, content):
+        """An empty document with the properties of content."""
+        doc = self.new_document()
+        properties = content.get("properties", {})
+        for name in PROPERTIES:
+            if name in properties:
+                setattr(doc.core_properties, name, properties[name])
+        if self.timestamp is not None:
+            doc.core_properties.created = self.timestamp
+            doc.core_properties.modified = self.timestamp
+        return doc
+
+    def build(self, content):
+        """The python-docx Document for a content dict."""
+        doc = self.new_content_document(content)
+        self.add_blocks(doc, content["blocks"])
+        return doc
+
+    def add_blocks(self, doc, blocks):
+        for block in blocks:
+            self.renderers[block[0]](doc, *block[1:])
+
+    def fragment(self, blocks):
+        """The body XML of blocks rendered on their own, as bytes."""
+        doc = self.new_document()
+        self.add_blocks(doc, blocks)
+        return b"".join(etree.tostring(element, encoding="utf-8")
+                        for element in doc.element.body
+                        if element.tag != qn("w:sectPr"))
+
+    def assemble(self, content, fragments):
+        """The Document for content whose body is the given fragments."""
+        doc = self.new_content_document(content)
+        end = doc.element.body.find(qn("w:sectPr"))
+        for fragment in fragments:
+            for element in etree.fromstring(b"<f>%s</f>" % fragment):
+                end.addprevious(element)
+        return doc
+
+    def save(self, doc, path):
+        with atomic_output(path) as tmp:
+            if self.timestamp is None:
+                doc.save(tmp)
+                return
+            buffer = BytesIO()
+            doc.save(buffer)
+            with open(tmp, "wb") as f:
+                f.write(fixed_zip(buffer.getvalue(),
+                                  self.timestamp.timetuple()[:6]))
+
+    def render(self, content, directory=None):
+        """Write content["file"] (into directory, if given); returns its
+        path."""
+        path = os.path.join(directory or "", content["file"])
+        self.save(self.build(content), path)
+        return path
+
+    def _add_paragraph(self, doc, text="", style=None):
+        """doc.add_paragraph(text, style), with the style id taken from the
+        registry."""
+        para = doc.add_paragraph(text)
+        if style is not None:
+            para._p.style = self.styles.id(style)
+        return para
+
+    def _title(self, doc, text):
+        self._add_paragraph(doc, text, "Title").alignment = \
+            WD_ALIGN_PARAGRAPH.CENTER
+
+    def _heading(self, doc, text, level):
+        self._add_paragraph(doc, text, f"Heading {level}")
+
+    def _paragraph(self, doc, text, style, align):
+        para = self._add_paragraph(doc, text, style)
+        if align:
+            para.alignment = ALIGNMENTS[align]
+
+    def _list(self, doc, style, items):
+        for item in items:
+            self._add_paragraph(doc, item, style)
+
+    def _rich(self, doc, spans, style):
+        para = self._add_paragraph(doc, "", style)
+        for text, char_style in spans:
+            run = para.add_run(text)
+            if char_style is not None:
+                run._r.style = self.styles.id(char_style,
+                                              WD_STYLE_TYPE.CHARACTER)
+
+    def _code(self, doc, text):
+        self._add_paragraph(doc, text, 'Code')
+
+    def _timestamp(self, doc, fmt, align):
+        self._paragraph(doc, self.stamp(fmt), None, align)
+
+    def stamp(self, fmt):
+        return format_time(fmt, self.timestamp)
+
+    @staticmethod
+    def _page_break(doc):
+        doc.add_page_break()
+
+
+_engine = None
+
+
+def render_document(content, directory=None):
+    """Render with the process-wide engine, created on first use."""
+    global _engine
+    if _engine is None:
+        _engine = DocEngine(fixed_timestamp())
+    return _engine.render(content, directory)
+
+
+def load_content(path):
+    """The DOCUMENT dict of a notes script, without running its main."""
+    return runpy.run_path(path, run_name="notes")["DOCUMENT"]
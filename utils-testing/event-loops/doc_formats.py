@@ -0,0 +1,276 @@
+"""
+Markdown and HTML renderings of the notes content (build_docs.py --format)
+
+The same content dicts DocEngine turns into .docx, written as Markdown or
+as one standalone HTML page, so all three come from the notes scripts and
+cannot drift apart. The output file is content["file"] with the suffix of
+the format.
+
+Paragraph styles map onto what the formats have: 'List Bullet' and 'List
+Number' (and their 'List Bullet 2' ... levels) become nested lists, 'List
+Continue' a paragraph of the item above, 'Intense Quote' and 'Quote' a
+block quote; any other style is a plain paragraph. A bullet or number the
+author typed at the start of a list item ("• ...", "1. ...") is dropped,
+the list draws its own. Empty paragraphs, spacers in the .docx, are left
+out, and a page break is a horizontal rule.
+
+Text is written as it is: Markdown in the notes (**bold**) stays Markdown,
+and HTML only escapes it. The character styles of rich paragraphs become
+**strong**, *emphasis* and `code`.
+"""
+
+import html
+import os
+import re
+
+from doc_engine import atomic_output, format_time
+
+SUFFIXES = {"md": ".md", "html": ".html"}
+# character style -> Markdown marker, HTML tag
+INLINE = {"Strong": ("**", "strong"), "Emphasis": ("*", "em"),
+          "Code Char": ("`", "code")}
+QUOTE_STYLES = ("Intense Quote", "Quote")
+LIST_STYLE = re.compile(r"List (Bullet|Number|Continue)(?: (\d))?$")
+MARKER = {"Bullet": re.compile(r"[•·▪‣◦-]\s*"),
+          "Number": re.compile(r"\d+[.)]\s+")}
+MD_LINE_START = re.compile(r"([#>+*-]|\d+[.)])(\s|$)")
+
+CSS = """\
+body { max-width: 50em; margin: 2em auto; padding: 0 1em;
+       font-family: Calibri, Helvetica, Arial, sans-serif; line-height: 1.4; }
+h1 { text-align: center; }
+pre { font-family: Consolas, monospace; font-size: 10pt;
+      margin: 6pt 0 6pt 0.25in; }
+blockquote { font-style: italic; color: #1f3864;
+             border-left: 3px solid #4472c4; padding-left: 1em; }
+.center { text-align: center; }
+hr { border: none; border-top: 1px dashed #999; margin: 2em 0; }
+"""
+
+
+def output_path(content, fmt, directory=None):
+    stem = os.path.splitext(content["file"])[0]
+    return os.path.join(directory or "", stem + SUFFIXES[fmt])
+
+
+def paragraphs(blocks, timestamp=None):
+    """The blocks as a flat list of
+
+        ("heading", text, level)        level 0 is the title
+        ("text", text, align)
+        ("quote", text)
+        ("item", text, "ul" | "ol", depth)
+        ("continue", text, depth)
+        ("pre", text)
+        ("rule",)
+
+    with the empty paragraphs left out. text is a string, or the (text,
+    character style) spans of a rich paragraph."""
+    found = []
+
+    def para(text, style, align=None):
+        if not text:
+            return
+        match = LIST_STYLE.match(style or "")
+        if style in QUOTE_STYLES:
+            found.append(("quote", text))
+        elif match:
+            kind, depth = match.group(1), int(match.group(2) or 1) - 1
+            if kind == "Continue":
+                found.append(("continue", text, depth))
+            else:
+                if isinstance(text, str) and MARKER[kind].match(text):
+                    text = MARKER[kind].sub("", text, count=1)
+                found.append(("item", text,
+                              "ul" if kind == "Bullet" else "ol", depth))
+        else:
+            found.append(("text", text, align))
+
+    for block in blocks:
+        kind = block[0]
+        if kind == "title":
+            found.append(("heading", block[1], 0))
+        elif kind == "heading":
+            found.append(("heading", block[1], block[2]))
+        elif kind == "paragraph":
+            para(*block[1:])
+        elif kind == "list":
+            for item in block[2]:
+                para(item, block[1])
+        elif kind == "rich":
+            para(block[1], block[2])
+        elif kind in ("code", "diagram"):
+            found.append(("pre", block[1].strip("\n")))
+        elif kind == "timestamp":
+            para(format_time(block[1], timestamp), None, block[2])
+        elif kind == "page_break":
+            found.append(("rule",))
+        else:
+            raise ValueError(f"unknown block {kind!r}")
+    return found
+
+
+# Markdown
+
+def _md_spans(spans):
+    out = []
+    for text, style in spans:
+        marker = INLINE.get(style, ("",))[0]
+        if marker == "`":
+            marker = "`" * _ticks(text)
+        # Markdown puts the spaces outside the markers
+        core = text.strip()
+        lead, trail = text[:len(text) - len(text.lstrip())], \
+            text[len(text.rstrip()):]
+        out.append(f"{lead}{marker}{core}{marker}{trail}"
+                   if marker and core else text)
+    return "".join(out)
+
+
+def _md_text(text, indent=""):
+    if not isinstance(text, str):
+        text = _md_spans(text)
+    lines = []
+    for line in text.replace("\r", "\n").split("\n"):
+        if MD_LINE_START.match(line):
+            # would start a list, heading or quote
+            line = re.sub(r"^(\d+)([.)])", r"\1\\\2", line) \
+                if line[0].isdigit() else "\\" + line
+        lines.append(line)
+    return (" \\\n" + indent).join(line.rstrip() for line in lines)
+
+
+def _ticks(text):
+    """One more than the longest run of backticks in text."""
+    return max((len(run) for run in re.findall("`+", text)), default=0) + 1
+
+
+def _fence(text):
+    return "`" * max(3, _ticks(text))
+
+
+def render_markdown(content, timestamp=None):
+    chunks = []    # (text, whether it is a list line)
+    indents = []   # text indent of the open item at each depth
+    for para in paragraphs(content["blocks"], timestamp):
+        kind = para[0]
+        if kind == "item":
+            text, tag, depth = para[1:]
+            depth = min(depth, len(indents))
+            del indents[depth:]
+            lead = indents[-1] if indents else ""
+            marker = "- " if tag == "ul" else "1. "
+            indents.append(lead + " " * len(marker))
+            chunks.append((lead + marker + _md_text(text, indents[-1]),
+                           True))
+            continue
+        if kind == "continue" and indents:
+            indent = indents[min(para[2], len(indents) - 1)]
+            chunks.append((indent + _md_text(para[1], indent), False))
+            continue
+        indents = []
+        if kind == "heading":
+            chunks.append(("#" * min(para[2] + 1, 6) + " "
+                           + para[1].replace("\n", " "), False))
+        elif kind == "quote":
+            chunks.append(("> " + _md_text(para[1], "> "), False))
+        elif kind == "pre":
+            fence = _fence(para[1])
+            chunks.append((f"{fence}\n{para[1]}\n{fence}", False))
+        elif kind == "rule":
+            chunks.append(("---", False))
+        else:
+            chunks.append((_md_text(para[1]), False))
+
+    out = []
+    for n, (text, is_item) in enumerate(chunks):
+        if n:
+            out.append("\n" if is_item and chunks[n - 1][1] else "\n\n")
+        out.append(text)
+    return "".join(out) + "\n"
+
+
+# HTML
+
+def _html_text(text):
+    if not isinstance(text, str):
+        out = []
+        for chunk, style in text:
+            tag = INLINE.get(style, (None, None))[1]
+            chunk = _html_text(chunk)
+            out.append(f"<{tag}>{chunk}</{tag}>" if tag else chunk)
+        return "".join(out)
+    return "<br>\n".join(html.escape(line) for line in
+                         text.replace("\r", "\n").split("\n"))
+
+
+def render_html(content, timestamp=None):
+    properties = content.get("properties", {})
+    page_title = properties.get("title") or next(
+        (block[1] for block in content["blocks"] if block[0] == "title"),
+        content["file"])
+    out = ["<!DOCTYPE html>", '<html lang="en">', "<head>",
+           '<meta charset="utf-8">',
+           f"<title>{html.escape(page_title)}</title>"]
+    for name in ("author", "subject", "keywords"):
+        if properties.get(name):
+            out.append(f'<meta name="{name}" '
+                       f'content="{html.escape(properties[name])}">')
+    out += ["<style>", CSS.rstrip("\n"), "</style>", "</head>", "<body>"]
+
+    lists = []   # tags of the open lists; each has an open <li>
+
+    def close_lists(depth=0):
+        while len(lists) > depth:
+            out.append(f"</li></{lists.pop()}>")
+
+    for para in paragraphs(content["blocks"], timestamp):
+        kind = para[0]
+        if kind == "item":
+            text, tag, depth = para[1:]
+            depth = min(depth, len(lists))
+            close_lists(depth + 1)
+            if len(lists) > depth and lists[-1] != tag:
+                close_lists(depth)
+            if len(lists) > depth:
+                out.append("</li>")
+            else:
+                out.append(f"<{tag}>")
+                lists.append(tag)
+            out.append(f"<li>{_html_text(text)}")
+            continue
+        if kind == "continue" and lists:
+            close_lists(min(para[2], len(lists) - 1) + 1)
+            out.append(f"<p>{_html_text(para[1])}</p>")
+            continue
+        close_lists()
+        if kind == "heading":
+            level = min(para[2] + 1, 6)
+            out.append(f"<h{level}>{_html_text(para[1])}</h{level}>")
+        elif kind == "quote":
+            out.append(f"<blockquote><p>{_html_text(para[1])}</p>"
+                       f"</blockquote>")
+        elif kind == "pre":
+            out.append(f"<pre><code>{html.escape(para[1])}</code></pre>")
+        elif kind == "rule":
+            out.append("<hr>")
+        else:
+            attr = f' class="{para[2]}"' if para[2] else ""
+            out.append(f"<p{attr}>{_html_text(para[1])}</p>")
+    close_lists()
+    out += ["</body>", "</html>"]
+    return "\n".join(out) + "\n"
+
+
+RENDERERS = {"md": render_markdown, "html": render_html}
+
+
+def render(content, fmt, directory=None, timestamp=None):
+    """Write content as Markdown ("md") or HTML ("html"); returns the
+    path."""
+    path = output_path(content, fmt, directory)
+    text = RENDERERS[fmt](content, timestamp)
+    with atomic_output(path) as tmp:
+        with open(tmp, "w", encoding="utf-8", newline="\n") as f:
+            f.write(text)
+    return path
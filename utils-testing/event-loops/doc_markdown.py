@@ -0,0 +1,365 @@
+"""
+The Markdown docs as notes content (build_docs.py --markdown)
+
+docs/streams/*.md and docs/event-loops/event-loops.md are read into the
+same content dicts as the notes scripts and rendered by the same engine,
+so the .docx of those pages never needs a copy of their text.
+
+parse() reads a file line by line, once, and yields doc_engine blocks as
+it goes; it keeps only the paragraph or code block it is in. It knows the
+Markdown the docs use:
+
+    # Title, ## ... ####      title, then heading levels 1 to 3
+    Text / ===, ---          setext headings
+    - item, 1. item          'List Bullet' / 'List Number', nested by
+                             indent ('List Bullet 2', ...); text indented
+                             under an item after a blank line is 'List
+                             Continue'
+    > quote                  'Quote'
+    ```lang ... ```          code ("```text" is a diagram)
+    ---, ***                 an empty paragraph, as between the sections
+                             of the notes
+    **strong**, *em*, `code` the character styles 'Strong', 'Emphasis'
+                             and 'Code Char' of a rich paragraph
+    [text](url)              text (url)
+
+Lines end a paragraph at a blank line; two trailing spaces or a backslash
+break the line. Anything else, tables and HTML included, is plain text.
+
+MarkdownCache keeps the blocks of every file it parsed, as JSON under
+the cache directory, keyed by the path. A file whose size and mtime are
+unchanged is not read at all. Any other file is read once, line by line,
+into both the SHA-256 and the parser; when the hash is the one of the
+entry (touched, checked out again) the cached blocks are kept.
+"""
+
+import glob
+import hashlib
+import json
+import os
+import re
+
+from doc_engine import atomic_output, code, diagram, heading, paragraph, \
+    rich, title
+
+PARSER_VERSION = 1   # bump when parse() gives other blocks
+
+ROOT = os.path.normpath(os.path.join(os.path.dirname(
+    os.path.abspath(__file__)), "..", ".."))
+DOCS_DIR = os.path.join(ROOT, "docs")
+
+FENCE = re.compile(r"^(\s*)(`{3,}|~{3,})\s*([\w+-]*)")
+HEADING = re.compile(r"^\s{0,3}(#{1,6})\s+(.*?)(?:\s+#+)?\s*$")
+SETEXT = re.compile(r"^\s{0,3}(=+|-+)\s*$")
+RULE = re.compile(r"^\s{0,3}([-*_])(?:\s*\1){2,}\s*$")
+ITEM = re.compile(r"^(\s*)([-*+]|\d{1,9}[.)])\s+(.*)$")
+QUOTE = re.compile(r"^\s{0,3}>\s?(.*)$")
+INLINE = re.compile(r"""
+    \\(?P<escaped>[!-/:-@\[-`{-~])
+  | (?P<ticks>`+)(?P<code>.+?)(?P=ticks)
+  | \*\*(?P<strong_star>\S(?:.*?\S)?)\*\*
+  | (?<!\w)__(?P<strong_under>\S(?:.*?\S)?)__(?!\w)
+  | (?<!\w)_(?P<em_under>[^\s_](?:.*?[^\s_])?)_(?!\w)
+  | \*(?P<em_star>[^\s*](?:.*?[^\s*])?)\*
+  | \[(?P<link>[^\]]+)\]\((?P<url>[^)\s]+)\)
+""", re.X)
+
+
+def inline(text, outer=None):
+    """The (text, character style) spans of a line of Markdown."""
+    spans = []
+
+    def add(chunk, style):
+        if not chunk:
+            return
+        if spans and spans[-1][1] == style:
+            spans[-1] = (spans[-1][0] + chunk, style)
+        else:
+            spans.append((chunk, style))
+
+    pos = 0
+    for m in INLINE.finditer(text):
+        add(text[pos:m.start()], outer)
+        pos = m.end()
+        if m["escaped"]:
+            add(m["escaped"], outer)
+        elif m["ticks"]:
+            value = m["code"]
+            if value.startswith(" ") and value.endswith(" ") \
+                    and value.strip():
+                value = value[1:-1]
+            add(value, "Code Char")
+        elif m["strong_star"] or m["strong_under"]:
+            for chunk, style in inline(m["strong_star"] or m["strong_under"],
+                                       "Strong"):
+                add(chunk, style)
+        elif m["em_under"] or m["em_star"]:
+            for chunk, style in inline(m["em_under"] or m["em_star"],
+                                       outer or "Emphasis"):
+                add(chunk, style)
+        else:
+            for chunk, style in inline(m["link"], outer):
+                add(chunk, style)
+            add(f" ({m['url']})", outer)
+    add(text[pos:], outer)
+    return spans
+
+
+def plain(text):
+    """text without its inline markup, for headings."""
+    return "".join(chunk for chunk, _ in inline(text))
+
+
+def text_block(text, style=None):
+    """A paragraph block, rich if any of the text has a character style."""
+    spans = inline(text)
+    if all(style is None for _, style in spans):
+        return paragraph("".join(chunk for chunk, _ in spans), style)
+    return rich(spans, style)
+
+
+def list_style(kind, depth):
+    return kind if depth == 0 else f"{kind} {min(depth, 2) + 1}"
+
+
+class MarkdownParser:
+    """Line by line Markdown to blocks; feed() and close() return the
+    blocks that are complete."""
+
+    def __init__(self):
+        self.out = []
+        self.lines = []      # the open paragraph, item or quote
+        self.style = None    # its paragraph style
+        self.kind = None     # "paragraph", "item", "quote", "continue"
+        self.items = []      # marker indents of the open list items
+        self.fence = None    # (marker, indent, language, lines)
+        self.blank = True    # the previous line was blank
+        self.seen_title = False
+
+    def _emit(self, block):
+        self.out.append(block)
+
+    def _drain(self):
+        out, self.out = self.out, []
+        return out
+
+    def _end_text(self):
+        if self.kind is None:
+            return
+        text = []
+        last = len(self.lines) - 1
+        for n, line in enumerate(self.lines):
+            stripped = line.strip()
+            if n == last:
+                text.append(stripped)
+            elif stripped.endswith("\\"):
+                text += [stripped[:-1], "\n"]
+            else:
+                text += [stripped, "\n" if line.endswith("  ") else " "]
+        self._emit(text_block("".join(text), self.style))
+        self.lines = []
+        self.style = self.kind = None
+
+    def _heading(self, text, level):
+        text = plain(text)
+        if level == 1 and not self.seen_title:
+            self.seen_title = True
+            self._emit(title(text))
+        else:
+            self._emit(heading(text, max(level - 1, 1)))
+
+    def _start(self, kind, style, text):
+        self._end_text()
+        self.kind, self.style, self.lines = kind, style, [text]
+
+    def feed(self, line):
+        line = line.rstrip("\r\n")
+        if self.fence is not None:
+            self._fence_line(line)
+            return self._drain()
+        if not line.strip():
+            self._end_text()
+            self.blank = True
+            return self._drain()
+        self._line(line)
+        self.blank = False
+        return self._drain()
+
+    def _fence_line(self, line):
+        marker, indent, language, lines = self.fence
+        stripped = line.strip()
+        if stripped.startswith(marker) and not stripped.strip(marker[0]):
+            text = "\n".join(lines)
+            self._emit(diagram(text) if language == "text" else code(text))
+            self.fence = None
+            return
+        # drop up to the indent of the opening fence
+        cut = len(line) - len(line.lstrip(" "))
+        lines.append(line[min(cut, indent):])
+
+    def _line(self, line):
+        m = FENCE.match(line)
+        if m:
+            self._end_text()
+            if not m[1]:
+                self.items = []
+            self.fence = (m[2], len(m[1]), m[3], [])
+            return
+        m = HEADING.match(line)
+        if m:
+            self._end_text()
+            self.items = []
+            self._heading(m[2], len(m[1]))
+            return
+        m = SETEXT.match(line)
+        if m and self.kind == "paragraph" and not self.blank:
+            text = " ".join(part.strip() for part in self.lines)
+            self.lines = []
+            self.style = self.kind = None
+            self.items = []
+            self._heading(text, 1 if m[1][0] == "=" else 2)
+            return
+        if RULE.match(line):
+            self._end_text()
+            self.items = []
+            self._emit(paragraph())
+            return
+        m = QUOTE.match(line)
+        if m:
+            if self.kind != "quote":
+                self._start("quote", "Quote", m[1])
+            else:
+                self.lines.append(m[1])
+            return
+        m = ITEM.match(line)
+        if m:
+            indent = len(m[1].expandtabs(4))
+            while self.items and self.items[-1] >= indent:
+                self.items.pop()
+            depth = len(self.items)
+            self.items.append(indent)
+            kind = "List Bullet" if m[2] in "-*+" else "List Number"
+            self._start("item", list_style(kind, depth), m[3])
+            return
+        if self.kind is not None and not self.blank:
+            self.lines.append(line)   # continues the open paragraph
+            return
+        indent = len(line) - len(line.lstrip())
+        if self.items and indent:
+            depth = max(sum(1 for i in self.items if i < indent) - 1, 0)
+            self._start("continue", list_style("List Continue", depth),
+                        line.strip())
+            return
+        self.items = []
+        self._start("paragraph", None, line.strip())
+
+    def close(self):
+        if self.fence is not None:
+            self._fence_line(self.fence[0])   # an unclosed fence ends here
+        self._end_text()
+        return self._drain()
+
+
+def parse(lines):
+    """The blocks of Markdown lines (e.g. an open file), as they are
+    read."""
+    parser = MarkdownParser()
+    for line in lines:
+        yield from parser.feed(line)
+    yield from parser.close()
+
+
+def _tuples(value):
+    # JSON gives lists back; blocks are tuples
+    return tuple(_tuples(v) for v in value) if isinstance(value, list) \
+        else value
+
+
+class MarkdownCache:
+    """The parsed blocks of Markdown files, one JSON entry per file."""
+
+    def __init__(self, root):
+        self.root = os.path.join(root, "markdown")
+        os.makedirs(self.root, exist_ok=True)
+
+    def _entry_path(self, path):
+        key = hashlib.sha256(os.path.abspath(path).encode()).hexdigest()
+        return os.path.join(self.root, key + ".json")
+
+    def _read_entry(self, path):
+        try:
+            with open(self._entry_path(path), encoding="utf-8") as f:
+                entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+        return entry if entry.get("parser") == PARSER_VERSION else None
+
+    def _write_entry(self, path, entry):
+        with atomic_output(self._entry_path(path)) as tmp:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(entry, f, ensure_ascii=False)
+
+    def blocks(self, path):
+        """(blocks of path, how they were got: "cached", "unchanged" or
+        "parsed")."""
+        st = os.stat(path)
+        entry = self._read_entry(path)
+        if entry and (entry["size"], entry["mtime_ns"]) == (st.st_size,
+                                                           st.st_mtime_ns):
+            return _tuples(entry["blocks"]), "cached"
+        # one pass: every line goes to the hash and the parser, and the
+        # blocks are dropped again if the content turns out unchanged
+        digest, parser, parsed = hashlib.sha256(), MarkdownParser(), []
+        with open(path, "rb") as f:
+            for line in f:
+                digest.update(line)
+                parsed += parser.feed(line.decode("utf-8"))
+        parsed += parser.close()
+        sha = digest.hexdigest()
+        if entry and entry["sha256"] == sha:
+            how = "unchanged"
+            blocks = _tuples(entry["blocks"])
+        else:
+            how = "parsed"
+            blocks = tuple(parsed)
+        self._write_entry(path, {
+            "parser": PARSER_VERSION, "path": os.path.abspath(path),
+            "size": st.st_size, "mtime_ns": st.st_mtime_ns, "sha256": sha,
+            "blocks": blocks})
+        return blocks, how
+
+
+def markdown_sources(paths=()):
+    """The .md files of paths (files or directories); every .md under
+    docs/ when there are none."""
+    found = []
+    for path in paths or [DOCS_DIR]:
+        if os.path.isdir(path):
+            found += sorted(glob.glob(os.path.join(path, "**", "*.md"),
+                                      recursive=True))
+        else:
+            found.append(path)
+    return found
+
+
+def markdown_content(path, blocks):
+    """The content dict of a Markdown file, for DocEngine.render()."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    found = next((block[1] for block in blocks if block[0] == "title"), name)
+    return {
+        "file": name + ".docx",
+        "properties": {"title": found,
+                       "subject": os.path.relpath(path, ROOT)},
+        "blocks": list(blocks),
+    }
+
+
+def load_markdown(path, cache=None):
+    """(content of a Markdown file, "cached" / "unchanged" / "parsed");
+    without a cache it is parsed straight from the file."""
+    if cache is not None:
+        blocks, how = cache.blocks(path)
+    else:
+        with open(path, encoding="utf-8") as f:
+            blocks, how = tuple(parse(f)), "parsed"
+    return markdown_content(path, blocks), how
@@ -0,0 +1,205 @@
+"""
+Streaming .docx writer for the notes content (build_docs.py --backend
+stream)
+
+python-docx keeps the whole document as an lxml tree until save(), so
+memory and time grow with the document. StreamingDocument writes
+word/document.xml straight into the zip archive instead, a paragraph at a
+time, and copies every other part - styles, numbering, settings, theme -
+from the DocEngine template as it is. Nothing of the body is kept: memory
+stays flat however long the document is.
+
+It has the calls the generators used (add_heading, add_paragraph,
+add_code_block, add_page_break), and render() takes the same content
+dicts (or any iterable of blocks, e.g. a generator) as DocEngine. The
+paragraphs are the XML python-docx writes for the same calls - style ids,
+xml:space, w:br for newlines and w:tab for tabs - so document.xml comes
+out byte for byte the same.
+
+The archive is written under a temporary name and renamed to path by
+close(); leaving the with block on an exception removes it instead.
+"""
+
+import os
+import zipfile
+from datetime import datetime
+from xml.sax.saxutils import escape
+
+from docx.enum.style import WD_STYLE_TYPE
+
+DOCUMENT_PART = "word/document.xml"
+CORE_PART = "docProps/core.xml"
+FLUSH_SIZE = 256 * 1024
+
+
+def run_xml(text, style_id=None):
+    """<w:r> of a text with newlines and tabs, as python-docx builds it."""
+    out = ["<w:r>"]
+    if style_id:
+        out.append(f'<w:rPr><w:rStyle w:val="{style_id}"/></w:rPr>')
+    for n, line in enumerate(text.replace("\r", "\n").split("\n")):
+        if n:
+            out.append("<w:br/>")
+        for m, chunk in enumerate(line.split("\t")):
+            if m:
+                out.append("<w:tab/>")
+            if chunk:
+                space = ' xml:space="preserve"' \
+                    if len(chunk.strip()) < len(chunk) else ""
+                out.append(f"<w:t{space}>{escape(chunk)}</w:t>")
+    if len(out) == 1:
+        return "<w:r/>"
+    out.append("</w:r>")
+    return "".join(out)
+
+
+class StreamingDocument:
+    """A .docx written as it is built:
+
+        with StreamingDocument(engine, path, properties) as doc:
+            doc.add_heading("1. Introduction", 1)
+            doc.add_paragraph("...")
+    """
+
+    def __init__(self, engine, path, properties=None):
+        self.engine = engine
+        self.path = path
+        parts = engine.template_parts()
+        when = engine.timestamp or datetime.now()
+        self.date_time = when.timetuple()[:6]
+        self.tmp = f"{path}.tmp-{os.getpid()}"
+        self.zip = zipfile.ZipFile(self.tmp, "w", zipfile.ZIP_DEFLATED)
+        self.body = None
+        self.pending = []
+        self.size = 0
+        core = engine.core_properties(properties or {})
+        for name, data in parts:
+            if name == DOCUMENT_PART:
+                head, self.tail = engine.document_frame()
+                self.body = self.zip.open(self._info(name), "w",
+                                          force_zip64=True)
+                self._write(head)
+                break   # the parts after it go in at close()
+            self.zip.writestr(self._info(name),
+                              core if name == CORE_PART else data)
+        self.rest = parts[[name for name, _ in parts].index(DOCUMENT_PART)
+                          + 1:]
+
+    def _info(self, name):
+        info = zipfile.ZipInfo(name, self.date_time)
+        info.compress_type = zipfile.ZIP_DEFLATED
+        info.create_system = 3
+        info.external_attr = 0o644 << 16
+        return info
+
+    def _write(self, text):
+        self.pending.append(text)
+        self.size += len(text)
+        if self.size >= FLUSH_SIZE:
+            self._flush()
+
+    def _flush(self):
+        self.body.write("".join(self.pending).encode())
+        self.pending = []
+        self.size = 0
+
+    def paragraph(self, text="", style=None, align=None, runs=None):
+        """runs: the <w:r>s to use instead of text."""
+        props = ""
+        if style is not None or align:
+            # python-docx adds a pPr for any style, even the default one
+            style_id = self.engine.style_id(style)
+            props = (f'<w:pStyle w:val="{style_id}"/>' if style_id else "") \
+                + (f'<w:jc w:val="{align}"/>' if align else "")
+            props = f"<w:pPr>{props}</w:pPr>" if props else "<w:pPr/>"
+        if runs is None:
+            runs = run_xml(text) if text else ""
+        if not runs and not props:
+            self._write("<w:p/>")
+        else:
+            self._write(f"<w:p>{props}{runs}</w:p>")
+
+    def add_rich(self, spans, style=None):
+        runs = "".join(
+            run_xml(text, self.engine.style_id(char_style,
+                                               WD_STYLE_TYPE.CHARACTER))
+            for text, char_style in spans)
+        self.paragraph(style=style, runs=runs)
+
+    # the python-docx calls of the notes scripts
+
+    def add_heading(self, text, level=1):
+        self.paragraph(text, "Title" if level == 0 else f"Heading {level}")
+
+    def add_paragraph(self, text="", style=None):
+        self.paragraph(text, style)
+
+    def add_code_block(self, text):
+        self.paragraph(text, "Code")
+
+    def add_page_break(self):
+        self._write('<w:p><w:r><w:br w:type="page"/></w:r></w:p>')
+
+    def add_blocks(self, blocks):
+        """Content blocks as in doc_engine."""
+        for block in blocks:
+            kind = block[0]
+            if kind == "title":
+                self.paragraph(block[1], "Title", "center")
+            elif kind == "heading":
+                self.add_heading(block[1], block[2])
+            elif kind == "paragraph":
+                self.paragraph(*block[1:])
+            elif kind == "list":
+                for item in block[2]:
+                    self.paragraph(item, block[1])
+            elif kind == "rich":
+                self.add_rich(block[1], block[2])
+            elif kind in ("code", "diagram"):
+                self.add_code_block(block[1])
+            elif kind == "timestamp":
+                self.paragraph(self.engine.stamp(block[1]), None, block[2])
+            elif kind == "page_break":
+                self.add_page_break()
+            else:
+                raise ValueError(f"unknown block {kind!r}")
+
+    def close(self):
+        if self.zip is None:
+            return
+        self._write(self.tail)
+        self._flush()
+        self.body.close()
+        for name, data in self.rest:
+            self.zip.writestr(self._info(name), data)
+        self.zip.close()
+        self.zip = None
+        os.replace(self.tmp, self.path)
+
+    def abort(self):
+        """Drop the partly written archive."""
+        if self.zip is None:
+            return
+        if self.body is not None:
+            self.body.close()
+        self.zip.close()
+        self.zip = None
+        os.remove(self.tmp)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def render(engine, content, directory=None):
+    """Write content["file"] with the streaming writer; returns its
+    path."""
+    path = os.path.join(directory or "", content["file"])
+    with StreamingDocument(engine, path, content.get("properties")) as doc:
+        doc.add_blocks(content["blocks"])
+    return path
@@ -0,0 +1,652 @@
+"""
+Deterministic simulator of the Node.js event loop described in the notes
+
+Models the six libuv phases of notes-by-deepSeek-ai.py section 3.2 and
+the two microtask queues on top of them:
+
+    timers          setTimeout / setInterval callbacks that are due
+    pending         I/O callbacks deferred to the next iteration
+    idle/prepare    internal (only shows up in traces)
+    poll            waits for I/O until the next timer is due, runs the
+                    completed I/O callbacks
+    check           setImmediate callbacks queued before the phase began
+    close           close callbacks
+
+After the main script and after every callback the process.nextTick queue
+is drained, then the promise microtasks; a nextTick queued by a promise
+callback runs once all microtasks are done (as in Node >= 11). Time is
+simulated: callbacks cost nothing unless they block, so a run is exactly
+repeatable, and timers follow libuv - their start is the loop time cached
+at the beginning of the iteration, in whole milliseconds.
+
+Workloads are scripts of actions, built in (SCENARIOS) or from a JSON
+file:
+
+    {"name": "...", "startup_ms": 1, "expected": ["..."], "script": [
+        {"op": "log", "text": "1. Script start"},
+        {"op": "setTimeout", "delay": 0, "do": [...]},
+        {"op": "setInterval", "delay": 10, "count": 5, "do": [...]},
+        {"op": "setImmediate", "do": [...]},
+        {"op": "nextTick", "do": [...]},
+        {"op": "promise", "then": [[...], [...]]},   # .then().then()
+        {"op": "io", "duration": 2, "do": [...]},    # e.g. fs.readFile
+        {"op": "close", "do": [...]},
+        {"op": "block", "ms": 5000},                 # busy loop
+        {"op": "repeat", "times": 1000, "do": [...]}
+    ]}
+
+startup_ms is the bootstrap time between the loop's first clock reading and
+its first iteration; 1 ms or more makes a setTimeout(0) in the main script
+fire before a setImmediate, as it usually does in practice.
+
+The timer queue is a binary heap (like libuv's) or a hierarchical timer
+wheel (256 slots per level, cascading as in the Linux kernel). Both give
+the same order; --bench compares them with millions of timers.
+
+Usage:
+    python loop_simulator.py section-5.2
+    python loop_simulator.py timer-limitations --trace trace.jsonl
+    python loop_simulator.py my_workload.json --timers wheel
+    python loop_simulator.py --bench 1000000
+
+Note: the order printed in section 5.2 of the notes puts "4. Promise 1"
+before "5. process.nextTick 2"; Node runs the whole nextTick queue first,
+which is what the simulator (and the expected list below) does.
+"""
+
+import argparse
+import heapq
+import json
+import random
+import sys
+import time
+from collections import deque
+
+PHASES = ("timers", "pending", "idle/prepare", "poll", "check", "close")
+TIMEOUT_MAX = 2 ** 31 - 1   # larger delays become 1 ms, as in Node
+PERCENTILES = (50, 90, 99)
+
+SCENARIOS = {
+    "section-5.2": {
+        "name": "Execution order priority (notes section 5.2)",
+        "startup_ms": 1,
+        "expected": ["1. Script start", "2. Script end",
+                     "3. process.nextTick 1", "5. process.nextTick 2",
+                     "4. Promise 1", "6. Promise 2",
+                     "8. setTimeout", "9. setImmediate"],
+        "script": [
+            {"op": "log", "text": "1. Script start"},
+            {"op": "setTimeout", "delay": 0,
+             "do": [{"op": "log", "text": "8. setTimeout"}]},
+            {"op": "promise", "then": [
+                [{"op": "log", "text": "4. Promise 1"}],
+                [{"op": "log", "text": "6. Promise 2"}]]},
+            {"op": "nextTick",
+             "do": [{"op": "log", "text": "3. process.nextTick 1"}]},
+            {"op": "nextTick",
+             "do": [{"op": "log", "text": "5. process.nextTick 2"}]},
+            {"op": "setImmediate",
+             "do": [{"op": "log", "text": "9. setImmediate"}]},
+            {"op": "log", "text": "2. Script end"},
+        ],
+    },
+    "io-callback": {
+        "name": "setImmediate before setTimeout inside an I/O callback",
+        "expected": ["nextTick", "promise", "promise 2",
+                     "nextTick from promise", "immediate", "timeout"],
+        "script": [
+            {"op": "io", "duration": 2, "do": [
+                {"op": "setTimeout", "delay": 0,
+                 "do": [{"op": "log", "text": "timeout"}]},
+                {"op": "setImmediate",
+                 "do": [{"op": "log", "text": "immediate"}]},
+                {"op": "nextTick", "do": [{"op": "log", "text": "nextTick"}]},
+                {"op": "promise", "then": [
+                    [{"op": "log", "text": "promise"},
+                     {"op": "nextTick",
+                      "do": [{"op": "log",
+                              "text": "nextTick from promise"}]}],
+                    [{"op": "log", "text": "promise 2"}]]},
+            ]},
+        ],
+    },
+    "timer-limitations": {
+        "name": "A 100 ms timer behind 5 s of blocking (notes section 6.1)",
+        "script": [
+            {"op": "setTimeout", "delay": 100,
+             "do": [{"op": "log", "text": "timeout"}]},
+            {"op": "block", "ms": 5000},
+        ],
+    },
+    "heavy-load": {
+        "name": "10 ms interval timers next to 4 ms I/O callbacks",
+        "script": [
+            {"op": "repeat", "times": 100, "do": [
+                {"op": "setInterval", "delay": 10, "count": 50,
+                 "do": [{"op": "block", "ms": 0.05}]}]},
+            {"op": "repeat", "times": 200, "do": [
+                {"op": "io", "duration": 3,
+                 "do": [{"op": "block", "ms": 4}]}]},
+        ],
+    },
+}
+
+
+class HeapTimers:
+    """Timers in a binary heap ordered by (due, seq)."""
+
+    name = "heap"
+
+    def __init__(self):
+        self.heap = []
+
+    def __len__(self):
+        return len(self.heap)
+
+    def add(self, due, seq, timer):
+        heapq.heappush(self.heap, (due, seq, timer))
+
+    def next_due(self):
+        return self.heap[0][0] if self.heap else None
+
+    def pop_expired(self, now):
+        """(due, seq, timer) of every timer due at or before now, in
+        order."""
+        heap = self.heap
+        expired = []
+        while heap and heap[0][0] <= now:
+            expired.append(heapq.heappop(heap))
+        return expired
+
+
+class WheelTimers:
+    """Timers in a hierarchical timer wheel with a 1 ms tick.
+
+    Level k has SIZE slots of SIZE ** k ticks each. A timer goes into the
+    lowest level whose span covers it; when the clock reaches the start of
+    a slot of level k > 0, the slot is cascaded into the levels below.
+    Adding is O(1); expiring costs one cascade per timer and level.
+    """
+
+    name = "wheel"
+    BITS = 8
+    SIZE = 1 << BITS
+    MASK = SIZE - 1
+    LEVELS = 4   # 2 ** 32 ticks, more than TIMEOUT_MAX
+    MAX_BIT = BITS * LEVELS - 1
+
+    def __init__(self):
+        self.wheels = [[[] for _ in range(self.SIZE)]
+                       for _ in range(self.LEVELS)]
+        self.counts = [0] * self.LEVELS
+        self.current = 0   # every slot up to this tick has been expired
+        self.ready = []
+        self.size = 0
+
+    def __len__(self):
+        return self.size
+
+    def add(self, due, seq, timer):
+        self.size += 1
+        if due <= self.current:
+            self.ready.append((due, seq, timer))
+        else:
+            self._place((due, seq, timer))
+
+    def _place(self, entry):
+        level = min((entry[0] - self.current).bit_length() - 1,
+                    self.MAX_BIT) // self.BITS
+        slot = entry[0] >> (self.BITS * level) & self.MASK
+        self.wheels[level][slot].append(entry)
+        self.counts[level] += 1
+
+    def _cascade(self, level):
+        bucket = self.wheels[level][self.current >> (self.BITS * level)
+                                    & self.MASK]
+        if bucket:
+            entries = bucket[:]
+            bucket.clear()
+            self.counts[level] -= len(entries)
+            for entry in entries:
+                if entry[0] <= self.current:
+                    self.ready.append(entry)
+                else:
+                    self._place(entry)
+
+    def _advance(self, now):
+        bits, mask, counts = self.BITS, self.MASK, self.counts
+        while self.current < now:
+            if counts[0]:
+                tick = self.current + 1
+            else:
+                # nothing happens before the next slot of the lowest
+                # level in use begins: jump there
+                level = next((k for k in range(1, self.LEVELS) if counts[k]),
+                             None)
+                if level is None:
+                    self.current = now
+                    return
+                shift = bits * level
+                tick = ((self.current >> shift) + 1) << shift
+                if tick > now:
+                    self.current = now
+                    return
+            self.current = tick
+            if not tick & mask:
+                level = 1
+                while level < self.LEVELS - 1 \
+                        and not tick & ((1 << (bits * (level + 1))) - 1):
+                    level += 1
+                for k in range(level, 0, -1):   # higher levels first
+                    if counts[k]:
+                        self._cascade(k)
+            bucket = self.wheels[0][tick & mask]
+            if bucket:
+                counts[0] -= len(bucket)
+                self.ready.extend(bucket)
+                bucket.clear()
+
+    def next_due(self):
+        if self.ready:
+            return min(self.ready)[0]
+        best = None
+        for level in range(self.LEVELS):
+            if not self.counts[level]:
+                continue
+            shift = self.BITS * level
+            wheel = self.wheels[level]
+            start = self.current >> shift
+            for i in range(1, self.SIZE + 1):   # the current slot last
+                bucket = wheel[(start + i) & self.MASK]
+                if bucket:
+                    # skip the min() of a large bucket that starts later
+                    if best is None or (start + i) << shift < best:
+                        due = min(bucket)[0]
+                        if best is None or due < best:
+                            best = due
+                    break
+        return best
+
+    def pop_expired(self, now):
+        if now > self.current:
+            self._advance(now)
+        expired = sorted(self.ready)
+        self.ready = []
+        self.size -= len(expired)
+        return expired
+
+
+TIMER_QUEUES = {queue.name: queue for queue in (HeapTimers, WheelTimers)}
+
+
+class Timer:
+    __slots__ = ("callback", "delay", "repeat", "label", "cancelled")
+
+    def __init__(self, callback, delay, repeat, label):
+        self.callback = callback
+        self.delay = delay
+        self.repeat = repeat   # further runs of an interval
+        self.label = label
+        self.cancelled = False
+
+
+class Loop:
+    """One simulated Node process: the queues, the phases and a clock.
+
+    Callbacks are functions of the loop; they use the Node-like methods
+    below (set_timeout, next_tick, ...) and block() to spend time.
+    """
+
+    def __init__(self, timers="heap", trace=None):
+        self.clock = 0.0       # simulated milliseconds
+        self.now = 0           # uv_now(): the cached loop time
+        self.timers = TIMER_QUEUES[timers]()
+        self.seq = 0
+        self.ticks = deque()
+        self.microtasks = deque()
+        self.pending = deque()
+        self.io = []           # heap of (completes at, seq, callback)
+        self.immediates = deque()
+        self.closing = deque()
+        self.iteration = 0
+        self.phase = "main"
+        self.trace = trace     # trace(event dict), or None
+        self.output = []       # (clock, iteration, phase, text)
+        self.slippage = []     # ms a timer ran after it was due
+        self.callbacks = 0
+
+    # Node-like API used by callbacks
+
+    def log(self, text):
+        self.output.append((self.clock, self.iteration, self.phase, text))
+        if self.trace:
+            self._event("log", text=text)
+
+    def block(self, ms):
+        self.clock += ms
+
+    def set_timeout(self, callback, delay=1, label=None, repeat=0):
+        if not 1 <= delay <= TIMEOUT_MAX:
+            delay = 1
+        timer = Timer(callback, int(delay), repeat, label or "timeout")
+        self.timers.add(self.now + timer.delay, self._next_seq(), timer)
+        return timer
+
+    def set_interval(self, callback, delay=1, count=None, label=None):
+        """Runs count times (None: until cleared)."""
+        repeat = float("inf") if count is None else count - 1
+        return self.set_timeout(callback, delay, label or "interval", repeat)
+
+    @staticmethod
+    def clear_timeout(timer):
+        timer.cancelled = True
+
+    def set_immediate(self, callback, label="immediate"):
+        self.immediates.append((callback, label))
+
+    def next_tick(self, callback, label="nextTick"):
+        self.ticks.append((callback, label))
+
+    def queue_microtask(self, callback, label="microtask"):
+        self.microtasks.append((callback, label))
+
+    def promise_chain(self, callbacks):
+        """Promise.resolve().then(a).then(b)...: a is queued now, each
+        next one when the previous has run."""
+        def link(i):
+            def run(loop):
+                callbacks[i](loop)
+                if i + 1 < len(callbacks):
+                    loop.queue_microtask(link(i + 1), "promise")
+            return run
+        if callbacks:
+            self.queue_microtask(link(0), "promise")
+
+    def start_io(self, callback, duration, label="io"):
+        """An operation that completes duration ms from now; its callback
+        runs in the poll phase."""
+        heapq.heappush(self.io, (self.clock + duration, self._next_seq(),
+                                 (callback, label)))
+
+    def on_close(self, callback, label="close"):
+        self.closing.append((callback, label))
+
+    # the loop
+
+    def _next_seq(self):
+        self.seq += 1
+        return self.seq
+
+    def _event(self, event, **fields):
+        self.trace({"t": round(self.clock, 6), "iteration": self.iteration,
+                    "phase": self.phase, "event": event, **fields})
+
+    def _call(self, callback, label):
+        self.callbacks += 1
+        if self.trace:
+            self._event("callback", label=label)
+        callback(self)
+        self._drain_microtasks()
+
+    def _drain_microtasks(self):
+        ticks, microtasks = self.ticks, self.microtasks
+        while ticks or microtasks:
+            while ticks:
+                callback, label = ticks.popleft()
+                self._run_microtask(callback, label)
+            while microtasks:   # V8 runs the queue empty, new ones too
+                callback, label = microtasks.popleft()
+                self._run_microtask(callback, label)
+
+    def _run_microtask(self, callback, label):
+        self.callbacks += 1
+        if self.trace:
+            self._event("microtask", label=label)
+        callback(self)
+
+    def _enter(self, phase):
+        self.phase = phase
+        if self.trace:
+            self._event("phase")
+
+    def _update_time(self):
+        self.now = int(self.clock)
+
+    def alive(self):
+        return bool(len(self.timers) or self.io or self.immediates
+                    or self.closing or self.pending)
+
+    def run_main(self, script, startup_ms=0.0):
+        self._enter("main")
+        self._call(script, "main")
+        self.clock += startup_ms
+
+    def run(self, max_iterations=None):
+        while self.alive():
+            if max_iterations is not None \
+                    and self.iteration >= max_iterations:
+                break
+            self.iteration += 1
+            self._update_time()
+            self._enter("timers")
+            self._run_timers()
+            self._enter("pending")
+            for _ in range(len(self.pending)):
+                self._call(*self.pending.popleft())
+            self._enter("idle/prepare")
+            self._enter("poll")
+            self._poll()
+            self._enter("check")
+            for _ in range(len(self.immediates)):   # not the ones added now
+                self._call(*self.immediates.popleft())
+            self._enter("close")
+            while self.closing:
+                self._call(*self.closing.popleft())
+
+    def _run_timers(self):
+        for due, _, timer in self.timers.pop_expired(self.now):
+            if timer.cancelled:
+                continue
+            self.slippage.append(self.clock - due)
+            self._call(timer.callback, timer.label)
+            if timer.repeat and not timer.cancelled:
+                timer.repeat -= 1
+                self._update_time()
+                self.timers.add(self.now + timer.delay, self._next_seq(),
+                                timer)
+
+    def _poll(self):
+        # uv_backend_timeout(): do not wait with other work queued
+        if self.immediates or self.closing or self.pending:
+            timeout = 0.0
+        else:
+            due = self.timers.next_due()
+            timeout = None if due is None else max(0.0, due - self.clock)
+        wake = self.clock if timeout is None else self.clock + timeout
+        if self.io and (timeout is None or self.io[0][0] < wake):
+            wake = self.io[0][0]
+        if wake > self.clock:
+            if self.trace:
+                self._event("wait", ms=round(wake - self.clock, 6))
+            self.clock = wake
+        self._update_time()
+        ready = []
+        while self.io and self.io[0][0] <= self.clock:
+            ready.append(heapq.heappop(self.io)[2])
+        for callback, label in ready:
+            self._call(callback, label)
+
+
+def compile_actions(actions):
+    """A callback running a list of script actions."""
+    steps = [compile_action(action) for action in actions]
+
+    def run(loop):
+        for step in steps:
+            step(loop)
+    return run
+
+
+def compile_action(action):
+    op = action.get("op")
+    if op == "log":
+        text = action["text"]
+        return lambda loop: loop.log(text)
+    if op == "block":
+        ms = action["ms"]
+        return lambda loop: loop.block(ms)
+    if op == "promise":
+        chain = [compile_actions(step) for step in action["then"]]
+        return lambda loop: loop.promise_chain(chain)
+    if op == "repeat":
+        body, times = compile_actions(action["do"]), action["times"]
+
+        def repeat(loop):
+            for _ in range(times):
+                body(loop)
+        return repeat
+    body = compile_actions(action.get("do", []))
+    label = action.get("label", op)
+    if op == "setTimeout":
+        delay = action.get("delay", 1)
+        return lambda loop: loop.set_timeout(body, delay, label)
+    if op == "setInterval":
+        delay, count = action.get("delay", 1), action.get("count")
+        return lambda loop: loop.set_interval(body, delay, count, label)
+    if op == "setImmediate":
+        return lambda loop: loop.set_immediate(body, label)
+    if op == "nextTick":
+        return lambda loop: loop.next_tick(body, label)
+    if op == "io":
+        duration = action.get("duration", 0)
+        return lambda loop: loop.start_io(body, duration, label)
+    if op == "close":
+        return lambda loop: loop.on_close(body, label)
+    raise ValueError(f"unknown op {op!r} in {action}")
+
+
+def percentile(sorted_values, p):
+    """Nearest-rank p-th percentile of sorted values (also used by
+    threadpool_model.py)."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(p / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+
+def simulate(scenario, timers="heap", trace=None, max_iterations=None):
+    """Run a scenario dict; returns the loop and a summary dict."""
+    loop = Loop(timers, trace)
+    loop.run_main(compile_actions(scenario["script"]),
+                  scenario.get("startup_ms", 0.0))
+    loop.run(max_iterations)
+    late = sorted(loop.slippage)
+    summary = {
+        "scenario": scenario.get("name"),
+        "timers": timers,
+        "iterations": loop.iteration,
+        "callbacks": loop.callbacks,
+        "end_ms": round(loop.clock, 3),
+        "timer_runs": len(late),
+        "slippage_ms": {
+            **{f"p{p}": round(percentile(late, p), 3) for p in PERCENTILES},
+            "max": round(late[-1], 3) if late else 0.0,
+            "mean": round(sum(late) / len(late), 3) if late else 0.0,
+        },
+    }
+    expected = scenario.get("expected")
+    if expected is not None:
+        summary["matches_expected"] = \
+            [text for *_, text in loop.output] == expected
+    return loop, summary
+
+
+def bench(queue, n, max_delay, seed=1):
+    """Schedule n timers with delays in 1..max_delay from the main script
+    and run the loop dry; returns (schedule seconds, run seconds, loop)."""
+    rng = random.Random(seed)
+    delays = [rng.randint(1, max_delay) for _ in range(n)]
+    noop = lambda loop: None
+    loop = Loop(queue)
+    started = time.perf_counter()
+    for delay in delays:
+        loop.set_timeout(noop, delay)
+    scheduled = time.perf_counter()
+    loop.run()
+    return scheduled - started, time.perf_counter() - scheduled, loop
+
+
+def load_scenario(name):
+    if name in SCENARIOS:
+        return SCENARIOS[name]
+    with open(name, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Simulate the Node.js event loop phases for a scripted "
+                    "workload, or benchmark the timer queues.")
+    parser.add_argument("scenario", nargs="?",
+                        help=f"a built-in scenario ({', '.join(SCENARIOS)}) "
+                             f"or a JSON file")
+    parser.add_argument("--timers",
+                        help="timer queue: heap or wheel (default heap); "
+                             "comma separated for --bench (default both)")
+    parser.add_argument("--trace",
+                        help="write every phase, callback and log as JSON "
+                             "lines to this file ('-' for stdout)")
+    parser.add_argument("--max-iterations", type=int,
+                        help="stop after this many loop iterations")
+    parser.add_argument("--bench", type=int, metavar="N",
+                        help="benchmark the timer queues with N timers")
+    parser.add_argument("--max-delay", type=int, default=60000,
+                        help="--bench timer delays are 1..MAX ms "
+                             "(default 60000)")
+    args = parser.parse_args(argv)
+
+    if args.bench:
+        queues = args.timers.split(",") if args.timers else list(TIMER_QUEUES)
+        for queue in queues:
+            if queue not in TIMER_QUEUES:
+                parser.error(f"unknown timer queue {queue!r}")
+        for queue in queues:
+            schedule_s, run_s, loop = bench(queue, args.bench, args.max_delay)
+            print(f"{queue:>5}: {args.bench:,} timers  "
+                  f"schedule {schedule_s:.3f} s  run {run_s:.3f} s  "
+                  f"({loop.iteration:,} iterations, "
+                  f"{args.bench / (schedule_s + run_s):,.0f} timers/s)")
+        return
+    if not args.scenario:
+        parser.error("give a scenario or --bench N")
+    args.timers = args.timers or "heap"
+    if args.timers not in TIMER_QUEUES:
+        parser.error(f"unknown timer queue {args.timers!r}")
+    try:
+        scenario = load_scenario(args.scenario)
+    except (OSError, ValueError) as e:
+        parser.error(f"cannot load scenario {args.scenario}: {e}")
+
+    trace_file = None
+    trace = None
+    if args.trace:
+        trace_file = sys.stdout if args.trace == "-" \
+            else open(args.trace, "w", encoding="utf-8")
+        trace = lambda event: trace_file.write(json.dumps(event) + "\n")
+    try:
+        loop, summary = simulate(scenario, args.timers, trace,
+                                 args.max_iterations)
+    finally:
+        if trace_file not in (None, sys.stdout):
+            trace_file.close()
+
+    if args.trace != "-":
+        for clock, iteration, phase, text in loop.output:
+            print(f"{clock:10.3f} ms  #{iteration:<4} {phase:<12} {text}")
+        print(json.dumps(summary, indent=2))
+    if summary.get("matches_expected") is False:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,437 @@
+"""
+Profile the event-loop notes generators
+
+Renders every notes script (notes-*.py next to this file by default) the
+way the scripts and build_docs.py do, and measures each phase of the
+pipeline:
+
+    import      python-docx and lxml (doc_engine), once
+    styles      DocEngine(): the default template and the 'Code' style,
+                once
+    load        running the notes script for its DOCUMENT
+    setup       a copy of the template with the core properties
+    paragraphs  the blocks, timed section by section (doc_engine.sections)
+    save        serialising the XML and zipping the .docx
+
+For every phase and section it records the wall time and, with
+tracemalloc, the peak of the memory it allocated on top of what was
+already in use; for every section the paragraphs and XML elements it
+added to the body. The document.xml of the saved file is measured as well
+(doc_engine.document_stats).
+
+Results go to a JSON report, which can be saved as a baseline and compared
+with later runs like bench_generator.py in utils-testing/streams: a phase
+or section slower or bigger than the tolerance is a regression, and the
+script exits with status 1. Every document is run --repeat times; each
+phase and section keeps its best value and how far the next best run is
+from it (*_spread). A change is only a regression when it is also larger
+than the noise: the spread of either report, --min-seconds (MIN_CHANGE for
+memory) and --noise times the baseline time, as a whole run can drift by
+tens of percent on a shared or frequency-scaled machine.
+
+Two runs of the same code compare clean, while a section of a few
+milliseconds that gets more than twice as slow still shows up; on a quiet
+machine a lower --noise catches smaller changes. --cprofile also dumps the
+whole run for pstats or snakeviz. tracemalloc and cProfile slow everything
+down, so compare runs made with the same options (--no-memory for plain
+timings).
+
+Usage:
+    python profile_docs.py                        # report in doc_profile.json
+    python profile_docs.py --save-baseline doc_baseline.json
+    python profile_docs.py --baseline doc_baseline.json --tolerance 0.2 \
+        --tolerance peak_bytes=0.25
+    python profile_docs.py notes-by-quen-ai.py --cprofile notes.prof
+    python -m pstats notes.prof
+"""
+
+import argparse
+import cProfile
+import glob
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+BACKENDS = ("docx", "stream")
+
+# metric -> True when higher is better
+METRICS = {
+    "seconds": False,
+    "peak_bytes": False,
+}
+DEFAULT_TOLERANCE = 0.10
+DEFAULT_REPEAT = 5
+# changes below these are timer and allocator noise, whatever the spread
+MIN_CHANGE = {"seconds": 0.001, "peak_bytes": 16 * 1024}
+DEFAULT_NOISE = 1.0   # of a baseline time: whole runs drift by tens of %
+
+
+class Meter:
+    """Wall time and peak traced memory of the steps of a run."""
+
+    def __init__(self, memory):
+        self.memory = memory
+
+    @contextmanager
+    def measure(self, into):
+        if self.memory:
+            tracemalloc.reset_peak()
+            in_use = tracemalloc.get_traced_memory()[0]
+        started = time.perf_counter()
+        yield into
+        into["seconds"] = round(time.perf_counter() - started, 6)
+        if self.memory:
+            into["peak_bytes"] = tracemalloc.get_traced_memory()[1] - in_use
+
+
+def notes_scripts():
+    return sorted(glob.glob(os.path.join(HERE, "notes-*.py")))
+
+
+def section_title(blocks):
+    for block in blocks:
+        if block[0] in ("title", "heading"):
+            return block[1]
+    return "(untitled)"
+
+
+def profile_docx(engine, content, path, meter, phases, sections):
+    from doc_engine import sections as split
+
+    with meter.measure(phases["setup"]):
+        doc = engine.new_content_document(content)
+    body = doc.element.body
+    for blocks in split(content["blocks"]):
+        section = {"title": section_title(blocks), "blocks": len(blocks)}
+        before = len(body)
+        with meter.measure(section):
+            engine.add_blocks(doc, blocks)
+        added = list(body)[before - 1:-1]   # the sectPr stays last
+        section["paragraphs"] = len(added)
+        section["elements"] = sum(1 for element in added
+                                  for _ in element.iter())
+        sections.append(section)
+    with meter.measure(phases["save"]):
+        engine.save(doc, path)
+
+
+def profile_stream(engine, content, path, meter, phases, sections):
+    import doc_stream
+    from doc_engine import sections as split
+
+    with meter.measure(phases["setup"]):
+        doc = doc_stream.StreamingDocument(engine, path,
+                                           content.get("properties"))
+    for blocks in split(content["blocks"]):
+        section = {"title": section_title(blocks), "blocks": len(blocks)}
+        with meter.measure(section):
+            doc.add_blocks(blocks)
+        sections.append(section)
+    with meter.measure(phases["save"]):
+        doc.close()
+
+
+def profile_document(engine, script, directory, meter, backend):
+    from doc_engine import document_stats, load_content
+
+    phases = {name: {} for name in ("load", "setup", "paragraphs", "save")}
+    sections = []
+    with meter.measure(phases["load"]):
+        content = load_content(script)
+    path = os.path.join(directory, content["file"])
+    profile = profile_docx if backend == "docx" else profile_stream
+    profile(engine, content, path, meter, phases, sections)
+
+    paragraphs = phases["paragraphs"]
+    paragraphs["seconds"] = round(sum(s["seconds"] for s in sections), 6)
+    if meter.memory:
+        paragraphs["peak_bytes"] = max(
+            (s["peak_bytes"] for s in sections), default=0)
+    size, elements, run_properties = document_stats(path)
+    return {
+        "name": content["file"],
+        "script": os.path.basename(script),
+        "seconds": round(sum(p["seconds"] for p in phases.values()), 6),
+        "peak_bytes": max((p.get("peak_bytes", 0)
+                           for p in phases.values()), default=0),
+        "bytes": os.path.getsize(path),
+        "document_xml_bytes": size,
+        "elements": elements,
+        "run_properties": run_properties,
+        "phases": phases,
+        "sections": sections,
+    }
+
+
+def best(measurements):
+    """The lowest value of every metric of the same step in several runs,
+    and how far the next lowest is from it (metric_spread): the noise of
+    the best value, without the odd slow run that warms caches up."""
+    found = {}
+    for metric in METRICS:
+        if metric in measurements[0]:
+            values = sorted(m[metric] for m in measurements)
+            found[metric] = values[0]
+            found[f"{metric}_spread"] = round(values[1:2] and values[1]
+                                              - values[0] or 0, 6)
+    return found
+
+
+def best_run(runs):
+    """The fastest of the runs of a document, with every phase and section
+    at its best of all runs."""
+    found = dict(min(runs, key=lambda result: result["seconds"]))
+    found["phases"] = {name: best([r["phases"][name] for r in runs])
+                       for name in found["phases"]}
+    found["sections"] = [dict(section, **best([r["sections"][n]
+                                               for r in runs]))
+                         for n, section in enumerate(found["sections"])]
+    return found
+
+
+def run(scripts, directory, meter, backend, repeat):
+    """Profile the scripts; returns the pipeline phases and the documents,
+    at their best of repeat runs (the import is measured once)."""
+    pipeline = {"import": {}}
+    # doc_engine (and with it python-docx) is first imported here, to be
+    # measured; the functions above import from it when they run
+    with meter.measure(pipeline["import"]):
+        import doc_engine
+    styles = []
+    for _ in range(repeat):
+        with meter.measure({}) as step:
+            engine = doc_engine.DocEngine(doc_engine.fixed_timestamp())
+        styles.append(step)
+    pipeline["styles"] = best(styles)
+    documents = []
+    for script in scripts:
+        documents.append(best_run([
+            profile_document(engine, script, directory, meter, backend)
+            for _ in range(repeat)]))
+    return pipeline, documents
+
+
+def megabytes(value):
+    return f"{value / 1e6:8.1f} MB" if value is not None else ""
+
+
+def print_report(pipeline, documents):
+    for name, phase in pipeline.items():
+        print(f"{name:<12} {phase['seconds']:8.3f} s "
+              f"{megabytes(phase.get('peak_bytes'))}")
+    for doc in documents:
+        print(f"\n{doc['name']} ({doc['seconds']:.3f} s, document.xml "
+              f"{doc['document_xml_bytes']:,} bytes, {doc['elements']:,} "
+              f"elements)")
+        for name, phase in doc["phases"].items():
+            print(f"  {name:<10} {phase['seconds']:8.3f} s "
+                  f"{megabytes(phase.get('peak_bytes'))}")
+            if name != "paragraphs":
+                continue
+            for section in doc["sections"]:
+                elements = f"{section['elements']:>6,} elements" \
+                    if "elements" in section else ""
+                print(f"    {section['title'][:40]:<40} "
+                      f"{section['seconds']:8.4f} s {elements}")
+
+
+def flatten(pipeline, documents):
+    """{name: {metric: value}} of everything a baseline is compared on."""
+    found = {name: phase for name, phase in pipeline.items()}
+    for doc in documents:
+        found[doc["name"]] = doc
+        for name, phase in doc["phases"].items():
+            found[f"{doc['name']} {name}"] = phase
+        for n, section in enumerate(doc["sections"], 1):
+            found[f"{doc['name']} section {n} {section['title'][:40]}"] = \
+                section
+    return found
+
+
+# regression(), new_cases() and parse_tolerances() are the same in
+# streams/bench_generator.py; keep the two in step.
+
+def regression(name, metric, old, new, higher_is_better, tolerance,
+               floor=0):
+    """The message when new is worse than old by more than tolerance (a
+    fraction of old) and by more than floor; None otherwise."""
+    if not old or new is None or abs(new - old) <= floor:
+        return None
+    change = (new - old) / old
+    worse = -change if higher_is_better else change
+    if worse <= tolerance:
+        return None
+    return (f"{name}: {metric} {old} -> {new} "
+            f"({change:+.1%}, tolerance {tolerance:.0%})")
+
+
+def new_cases(names, known):
+    """The names that are not among known, in order."""
+    return [name for name in names if name not in known]
+
+
+def parse_tolerances(values):
+    tolerances = {"*": DEFAULT_TOLERANCE}
+    for value in values:
+        metric, _, amount = value.rpartition("=")
+        if metric and metric not in METRICS:
+            raise argparse.ArgumentTypeError(f"unknown metric {metric!r}")
+        tolerances[metric or "*"] = float(amount)
+    return tolerances
+
+
+def compare(report, baseline, tolerances, min_change=MIN_CHANGE,
+            noise=DEFAULT_NOISE):
+    """Return a list of regression messages (empty when all is well); a
+    phase or section of the baseline this run did not measure is one."""
+    previous = flatten(baseline["pipeline"], baseline["documents"])
+    current = flatten(report["pipeline"], report["documents"])
+    regressions = [f"{name}: in the baseline but not in this run"
+                   for name in new_cases(previous, current)]
+    for name, result in current.items():
+        before = previous.get(name)
+        if before is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            old = before.get(metric)
+            floor = max(min_change[metric],
+                        before.get(f"{metric}_spread", 0),
+                        result.get(f"{metric}_spread", 0),
+                        noise * (old or 0) if metric == "seconds" else 0)
+            message = regression(
+                name, metric, old, result.get(metric), higher_is_better,
+                tolerances.get(metric, tolerances["*"]), floor)
+            if message:
+                regressions.append(message)
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Profile the event-loop notes generators phase by "
+                    "phase.")
+    parser.add_argument("notes", nargs="*",
+                        help="notes scripts with a DOCUMENT (default: every "
+                             "notes-*.py here)")
+    parser.add_argument("--backend", choices=BACKENDS, default="docx",
+                        help="python-docx tree, or streaming writer "
+                             "(default docx)")
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                        help=f"runs per document, the best of them is "
+                             f"compared (default {DEFAULT_REPEAT})")
+    parser.add_argument("--min-seconds", type=float,
+                        default=MIN_CHANGE["seconds"],
+                        help=f"time changes up to this are never "
+                             f"regressions (default {MIN_CHANGE['seconds']})")
+    parser.add_argument("--noise", type=float, default=DEFAULT_NOISE,
+                        help=f"time changes up to this fraction of the "
+                             f"baseline are never regressions (default "
+                             f"{DEFAULT_NOISE})")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="no tracemalloc, for timings without its "
+                             "overhead")
+    parser.add_argument("--cprofile", metavar="FILE",
+                        help="also dump cProfile stats of the whole run")
+    parser.add_argument("--output-dir",
+                        help="keep the documents here (default: a "
+                             "temporary directory)")
+    parser.add_argument("-o", "--output", default="doc_profile.json",
+                        help="report file (default doc_profile.json)")
+    parser.add_argument("--baseline", help="compare with this report")
+    parser.add_argument("--save-baseline", metavar="FILE",
+                        help="also save the report as a baseline")
+    parser.add_argument("--tolerance", action="append", default=[],
+                        metavar="[METRIC=]FRACTION",
+                        help=f"allowed relative regression (default "
+                             f"{DEFAULT_TOLERANCE}); repeat per metric: "
+                             f"{', '.join(METRICS)}")
+    args = parser.parse_args(argv)
+    try:
+        tolerances = parse_tolerances(args.tolerance)
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        parser.error(str(e))
+    if args.repeat < 1:
+        parser.error("--repeat must be at least 1")
+    for script in args.notes:
+        if not os.path.isfile(script):
+            parser.error(f"no such notes script: {script}")
+    if "doc_engine" in sys.modules:
+        print("note: doc_engine is already imported; the import phase "
+              "measures nothing")
+
+    directory = args.output_dir or tempfile.mkdtemp(prefix="profile_docs_")
+    os.makedirs(directory, exist_ok=True)
+    meter = Meter(args.memory)
+    profiler = cProfile.Profile() if args.cprofile else None
+    if args.memory:
+        tracemalloc.start()
+    if profiler:
+        profiler.enable()
+    try:
+        pipeline, documents = run(args.notes or notes_scripts(), directory,
+                                  meter, args.backend, args.repeat)
+    finally:
+        if profiler:
+            profiler.disable()
+        if args.memory:
+            tracemalloc.stop()
+        if not args.output_dir:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    print_report(pipeline, documents)
+    report = {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "renderer": sys.modules["doc_engine"].RENDERER,
+            "backend": args.backend,
+            "tracemalloc": args.memory,
+            "cprofile": bool(profiler),
+            "repeat": args.repeat,
+        },
+        "pipeline": pipeline,
+        "documents": documents,
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+    print(f"\nReport written to {args.output}")
+    if profiler:
+        profiler.dump_stats(args.cprofile)
+        print(f"cProfile stats in {args.cprofile} "
+              f"(python -m pstats {args.cprofile})")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for option in ("backend", "tracemalloc", "cprofile"):
+            if baseline["meta"].get(option) != report["meta"][option]:
+                print(f"note: the baseline was made with {option} "
+                      f"{baseline['meta'].get(option)}, this run with "
+                      f"{report['meta'][option]}")
+        for name in new_cases(
+                flatten(report["pipeline"], report["documents"]),
+                flatten(baseline["pipeline"], baseline["documents"])):
+            print(f"note: {name} is new, not in the baseline")
+        regressions = compare(report, baseline, tolerances,
+                              dict(MIN_CHANGE, seconds=args.min_seconds),
+                              args.noise)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+"""
+Queueing model of the libuv thread pool for sizing UV_THREADPOOL_SIZE
+
+The notes (notes-by-deepSeek-ai.py section 2.3, notes-by-quen-ai.py
+section 9) list what shares the pool - fs, dns.lookup, crypto (pbkdf2,
+randomBytes, ...) and zlib - and that it has 4 threads unless
+UV_THREADPOOL_SIZE says otherwise. This tool predicts what a workload
+sees for a sweep of pool sizes: queue wait, latency percentiles per
+operation and thread utilisation.
+
+The model follows libuv: one FIFO work queue served by N threads, and
+"slow I/O" work (getaddrinfo / getnameinfo, i.e. dns.lookup) never takes
+more than (N + 1) // 2 threads, so DNS cannot starve the rest. Latency is
+wait + service time; the callback's time back on the event loop is not
+included.
+
+Every operation type has a Poisson arrival rate and a service-time
+distribution:
+
+    fixed:T                 always T
+    exp:MEAN                exponential
+    uniform:MIN:MAX
+    lognormal:MEDIAN:SIGMA  long tail, e.g. lognormal:2ms:0.8
+    trace                   resampled from measured times (--service-trace)
+
+Times take a unit (us, ms, s; ms by default). The same arrivals and
+service times are replayed for every pool size, so the sizes are compared
+on identical work.
+
+Measured service times come as JSON lines (or CSV with the same columns):
+
+    {"op": "crypto.pbkdf2", "ms": 41.3, "t": 12.004}
+
+t (seconds, optional) is when the operation was submitted. With --replay
+the trace itself is the workload: its arrivals and service times are used
+as they are.
+
+Usage:
+    python threadpool_model.py --op crypto.pbkdf2=20:fixed:45ms \\
+        --op fs.readFile=400:exp:1ms --op dns.lookup=50:lognormal:5ms:0.8
+    python threadpool_model.py --service-trace measured.jsonl \\
+        --op fs.readFile=300 --op zlib.gzip=40 --target-p99 20
+    python threadpool_model.py --service-trace measured.jsonl --replay \\
+        -o pool_sizes.json
+"""
+
+import argparse
+import csv
+import heapq
+import json
+import math
+import platform
+import random
+import sys
+from collections import deque
+from datetime import datetime, timezone
+
+from loop_simulator import percentile
+
+DEFAULT_SIZE = 4
+MAX_SIZE = 1024      # libuv >= 1.30; the notes' 128 is the older limit
+DEFAULT_SIZES = (1, 2, 4, 8, 16, 32, 64, 128)
+SLOW_IO_PREFIX = "dns."
+PERCENTILES = (50, 90, 99)
+UNITS = {"us": 1e-6, "ms": 1e-3, "s": 1.0}
+
+
+def parse_time(text):
+    """Seconds from '45ms', '200us', '1.5s' or a bare number of ms."""
+    for unit in sorted(UNITS, key=len, reverse=True):
+        if text.endswith(unit):
+            return float(text[:-len(unit)]) * UNITS[unit]
+    return float(text) * UNITS["ms"]
+
+
+def parse_distribution(text, samples=None):
+    """draw(rng) -> seconds for a distribution spec (see module doc)."""
+    kind, *params = text.split(":")
+    try:
+        if kind == "trace":
+            if not samples:
+                raise ValueError("no measured service times for it")
+            return lambda rng: rng.choice(samples)
+        if kind == "fixed" and len(params) == 1:
+            value = parse_time(params[0])
+            return lambda rng: value
+        if kind == "exp" and len(params) == 1:
+            rate = 1 / parse_time(params[0])
+            return lambda rng: rng.expovariate(rate)
+        if kind == "uniform" and len(params) == 2:
+            low, high = map(parse_time, params)
+            return lambda rng: rng.uniform(low, high)
+        if kind == "lognormal" and len(params) == 2:
+            mu, sigma = math.log(parse_time(params[0])), float(params[1])
+            return lambda rng: rng.lognormvariate(mu, sigma)
+    except (ValueError, ZeroDivisionError) as e:
+        raise ValueError(f"bad service time {text!r}: {e}")
+    raise ValueError(f"bad service time {text!r} (fixed:T, exp:MEAN, "
+                     f"uniform:MIN:MAX, lognormal:MEDIAN:SIGMA or trace)")
+
+
+def read_trace(path):
+    """[(op, service seconds, submitted at or None)] of a trace file."""
+    records = []
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            rows = csv.DictReader(f)
+        else:
+            rows = (json.loads(line) for line in f if line.strip())
+        for n, row in enumerate(rows, 1):
+            try:
+                t = row.get("t")
+                records.append((row["op"], float(row["ms"]) * UNITS["ms"],
+                                None if t in (None, "") else float(t)))
+            except (KeyError, TypeError, ValueError) as e:
+                raise ValueError(f"{path}: record {n}: {e!r}")
+    return records
+
+
+def poisson_jobs(specs, duration, seed):
+    """Jobs (arrival, op, service) of all operation types, by arrival.
+
+    specs: [(op, rate per second, draw)]. Each type has its own random
+    stream, so adding one leaves the others' jobs as they were.
+    """
+    jobs = []
+    for n, (op, rate, draw) in enumerate(specs):
+        rng = random.Random(f"{seed}:{n}:{op}")
+        t = rng.expovariate(rate)
+        while t < duration:
+            jobs.append((t, op, draw(rng)))
+            t += rng.expovariate(rate)
+    jobs.sort(key=lambda job: job[0])
+    return jobs
+
+
+def replay_jobs(records):
+    """Jobs straight from a trace; it must have submit times."""
+    if any(t is None for _, _, t in records):
+        raise ValueError("--replay needs a submit time t in every record")
+    start = min(t for _, _, t in records)
+    return sorted(((t - start, op, service) for op, service, t in records),
+                  key=lambda job: job[0])
+
+
+def summarize(values):
+    """Milliseconds: percentiles, max and mean of a list of seconds."""
+    values.sort()
+    result = {f"p{p}": round(percentile(values, p) * 1e3, 3)
+              for p in PERCENTILES}
+    result["max"] = round(values[-1] * 1e3, 3) if values else 0.0
+    result["mean"] = round(sum(values) / len(values) * 1e3, 3) \
+        if values else 0.0
+    return result
+
+
+def simulate(jobs, threads, slow_ops=()):
+    """Run the jobs through a pool of threads; returns a result dict.
+
+    Event driven: the next event is either the next arrival or the
+    earliest completion, and idle threads take work after each one.
+    """
+    slow_limit = (threads + 1) // 2
+    completions = []          # heap of (time, slow)
+    normal, slow = deque(), deque()
+    idle = threads
+    slow_running = 0
+    waits = {}
+    latencies = {}
+    busy = 0.0
+    queued = max_queued = 0
+    queue_area = 0.0          # integral of the queue length over time
+    last = 0.0
+    i, n = 0, len(jobs)
+    while i < n or completions:
+        if completions and (i == n or completions[0][0] <= jobs[i][0]):
+            t, was_slow = heapq.heappop(completions)
+            idle += 1
+            slow_running -= was_slow
+        else:
+            t = jobs[i][0]
+            (slow if jobs[i][1] in slow_ops else normal).append(i)
+            i += 1
+        queue_area += queued * (t - last)
+        last = t
+        queued = len(normal) + len(slow)
+        while idle and queued:
+            # FIFO, but slow I/O only while below its share of threads
+            if slow and slow_running < slow_limit \
+                    and (not normal or slow[0] < normal[0]):
+                job, is_slow = slow.popleft(), True
+            elif normal:
+                job, is_slow = normal.popleft(), False
+            else:
+                break
+            arrival, op, service = jobs[job]
+            waits.setdefault(op, []).append(t - arrival)
+            latencies.setdefault(op, []).append(t - arrival + service)
+            busy += service
+            heapq.heappush(completions, (t + service, is_slow))
+            idle -= 1
+            slow_running += is_slow
+            queued -= 1
+        max_queued = max(max_queued, queued)
+    end = max(last, 1e-9)
+    all_waits = [w for values in waits.values() for w in values]
+    return {
+        "threads": threads,
+        "jobs": n,
+        "end_s": round(end, 3),
+        "utilisation": round(busy / (threads * end), 4),
+        "mean_queue": round(queue_area / end, 3),
+        "max_queue": max_queued,
+        "wait_ms": summarize(all_waits),
+        "ops": {op: {"jobs": len(waits[op]),
+                     "wait_ms": summarize(waits[op]),
+                     "latency_ms": summarize(latencies[op])}
+                for op in sorted(waits)},
+    }
+
+
+def parse_op(text):
+    """NAME=RATE[:DISTRIBUTION] -> (name, rate, distribution or None)."""
+    name, sep, rest = text.partition("=")
+    if not sep or not name:
+        raise ValueError(f"bad --op {text!r} (NAME=RATE[:DISTRIBUTION])")
+    rate, _, dist = rest.partition(":")
+    try:
+        rate = float(rate)
+    except ValueError:
+        raise ValueError(f"bad rate in --op {text!r}")
+    if rate <= 0:
+        raise ValueError(f"rate must be positive in --op {text!r}")
+    return name, rate, dist or None
+
+
+def measured_rates(records):
+    """Submits per second of every op with submit times in the trace."""
+    times = {}
+    for op, _, t in records:
+        if t is not None:
+            times.setdefault(op, []).append(t)
+    return {op: len(ts) / (max(ts) - min(ts))
+            for op, ts in times.items() if len(ts) > 1 and max(ts) > min(ts)}
+
+
+def build_jobs(args, parser):
+    records = read_trace(args.service_trace) if args.service_trace else []
+    if args.replay:
+        if not records:
+            parser.error("--replay needs --service-trace")
+        return replay_jobs(records)
+    samples = {}
+    for op, service, _ in records:
+        samples.setdefault(op, []).append(service)
+    ops = {}
+    for op, rate in measured_rates(records).items():
+        ops[op] = (rate, "trace")
+    for text in args.op:
+        name, rate, dist = parse_op(text)
+        ops[name] = (rate, dist or "trace")
+    if not ops:
+        parser.error("give --op NAME=RATE:DISTRIBUTION or a --service-trace "
+                     "with submit times")
+    specs = []
+    for name, (rate, dist) in sorted(ops.items()):
+        try:
+            specs.append((name, rate, parse_distribution(dist,
+                                                         samples.get(name))))
+        except ValueError as e:
+            parser.error(f"{name}: {e}")
+    return poisson_jobs(specs, args.duration, args.seed)
+
+
+def print_result(result):
+    wait = result["wait_ms"]
+    print(f"{result['threads']:4} threads  util {result['utilisation']:7.2%}  "
+          f"queue mean {result['mean_queue']:.1f} max {result['max_queue']}  "
+          f"wait p50 {wait['p50']} p99 {wait['p99']} ms")
+    for op, stats in result["ops"].items():
+        wait, latency = stats["wait_ms"], stats["latency_ms"]
+        print(f"       {op:<22} wait p99 {wait['p99']:>10} ms   latency "
+              f"p50 {latency['p50']:>9} p90 {latency['p90']:>9} "
+              f"p99 {latency['p99']:>9} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Predict thread pool queueing and latency for a sweep "
+                    "of UV_THREADPOOL_SIZE values.")
+    parser.add_argument("--op", action="append", default=[],
+                        metavar="NAME=RATE[:DIST]",
+                        help="an operation type: arrivals per second and "
+                             "service times (default: from the trace)")
+    parser.add_argument("--service-trace", metavar="FILE",
+                        help="measured service times, JSON lines or .csv "
+                             "with op, ms and optionally t")
+    parser.add_argument("--replay", action="store_true",
+                        help="use the trace's own arrivals and service "
+                             "times as the workload")
+    parser.add_argument("--sizes",
+                        default=",".join(map(str, DEFAULT_SIZES)),
+                        help="comma separated pool sizes (default "
+                             "%(default)s)")
+    parser.add_argument("--duration", type=float, default=60.0,
+                        help="seconds of simulated arrivals (default 60)")
+    parser.add_argument("--slow-ops",
+                        help=f"comma separated ops that count as slow I/O "
+                             f"(default: names starting with "
+                             f"{SLOW_IO_PREFIX!r})")
+    parser.add_argument("--target-p99", type=float, metavar="MS",
+                        help="report the smallest size whose p99 latency "
+                             "is within MS for every op")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("-o", "--output",
+                        help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    try:
+        sizes = sorted({int(size) for size in args.sizes.split(",")})
+    except ValueError:
+        parser.error(f"bad --sizes {args.sizes!r}")
+    if not sizes or sizes[0] < 1 or sizes[-1] > MAX_SIZE:
+        parser.error(f"pool sizes must be 1..{MAX_SIZE}")
+    if args.duration <= 0:
+        parser.error("--duration must be positive")
+    try:
+        jobs = build_jobs(args, parser)
+    except (OSError, ValueError) as e:
+        parser.error(str(e))
+    if not jobs:
+        parser.error("the workload has no jobs")
+    ops = {op for _, op, _ in jobs}
+    slow_ops = set(args.slow_ops.split(",")) if args.slow_ops is not None \
+        else {op for op in ops if op.startswith(SLOW_IO_PREFIX)}
+
+    results = []
+    for size in sizes:
+        result = simulate(jobs, size, slow_ops)
+        print_result(result)
+        results.append(result)
+
+    recommended = None
+    if args.target_p99 is not None:
+        recommended = next(
+            (r["threads"] for r in results
+             if all(s["latency_ms"]["p99"] <= args.target_p99
+                    for s in r["ops"].values())), None)
+        print(f"smallest pool within p99 {args.target_p99} ms: "
+              f"{recommended or 'none of the sizes'}"
+              + (f" (default {DEFAULT_SIZE})" if recommended else ""))
+
+    if args.output:
+        report = {
+            "meta": {
+                "date": datetime.now(timezone.utc).isoformat(
+                    timespec="seconds"),
+                "ops": args.op,
+                "service_trace": args.service_trace,
+                "replay": args.replay,
+                "duration_s": None if args.replay else args.duration,
+                "slow_ops": sorted(slow_ops),
+                "seed": args.seed,
+                "python": platform.python_version(),
+            },
+            "target_p99_ms": args.target_p99,
+            "recommended_size": recommended,
+            "sizes": results,
+        }
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if args.target_p99 is not None and recommended is None:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
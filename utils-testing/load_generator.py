@@ -0,0 +1,329 @@
+"""
+Local HTTP load generator for the web-server and streams examples
+
+Puts repeatable load on the Node servers of this project (they all listen
+on 127.0.0.1:54321): web-server/web-server.ts serving the html/ pages, or
+the streaming endpoint of streams/transform-streams/transform-streams.ts.
+Only the standard library is used: asyncio streams and a small HTTP/1.1
+client that keeps its connections alive.
+
+Two modes:
+    closed loop (default)   every connection sends its next request as soon
+                            as the previous response has been read
+    fixed rate (--rate R)   R requests per second in total, whatever the
+                            server does; latency is measured from the time a
+                            request was due, so a stalled server cannot hide
+                            its queueing delay (no coordinated omission)
+
+Latency (until the last body byte) and time to first byte go into
+log-linear histograms (<1% error, constant memory); bodies are read in
+full - content-length, chunked or until close - and counted for MB/s.
+Results are printed and written as JSON.
+
+Usage:
+    python load_generator.py --paths /,/about,/contact --connections 2000
+    python load_generator.py --rate 5000 --connections 200 --duration 30 \\
+        -o web_server_run.json
+    python load_generator.py --connections 1 --duration 20   # transform
+
+Note: transform-streams.ts pipes one shared file stream into every
+response, so only the first request after a server start gets the data.
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import resource
+import sys
+import time
+from datetime import datetime, timezone
+from urllib.parse import urlsplit
+
+DEFAULT_URL = "http://127.0.0.1:54321"
+CONNECT_CONCURRENCY = 256   # connects in flight (listen backlog is 511)
+READ_SIZE = 256 * 1024
+PERCENTILES = (50, 90, 99, 99.9)
+
+
+class Histogram:
+    """Counts of microsecond values in log-linear buckets.
+
+    A value keeps its top SUB_BITS bits, so buckets are at most 1/64 of
+    their value wide.
+    """
+
+    SUB_BITS = 7
+
+    def __init__(self):
+        self.counts = {}
+        self.total = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, seconds):
+        value = int(seconds * 1e6)
+        shift = max(0, value.bit_length() - self.SUB_BITS)
+        key = value >> shift << shift
+        self.counts[key] = self.counts.get(key, 0) + 1
+        self.total += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def percentile(self, p):
+        """Upper edge of the bucket holding the p-th percentile, seconds,
+        but never more than the largest value added."""
+        rank = max(1, round(p / 100 * self.total))
+        seen = 0
+        for key in sorted(self.counts):
+            seen += self.counts[key]
+            if seen >= rank:
+                shift = max(0, key.bit_length() - self.SUB_BITS)
+                return min((key + (1 << shift) - 1) / 1e6, self.max)
+        return 0.0
+
+    def summary(self):
+        """Milliseconds: p50, p90, p99, p999, max and mean."""
+        if not self.total:
+            return None
+        result = {f"p{str(p).replace('.', '')}":
+                  round(self.percentile(p) * 1e3, 3) for p in PERCENTILES}
+        result["max"] = round(self.max * 1e3, 3)
+        result["mean"] = round(self.sum / self.total * 1e3, 3)
+        return result
+
+
+class ResponseError(Exception):
+    pass
+
+
+async def drain(reader, n):
+    while n > 0:
+        data = await reader.read(min(n, READ_SIZE))
+        if not data:
+            raise ResponseError("connection closed in the body")
+        n -= len(data)
+
+
+async def read_response(reader):
+    """Read one response; returns (status, body bytes, first byte time,
+    whether the connection can be reused)."""
+    status_line = await reader.readuntil(b"\r\n")
+    first_byte = time.perf_counter()
+    head = await reader.readuntil(b"\r\n\r\n")
+    try:
+        version, status = status_line.split(None, 2)[:2]
+        status = int(status)
+    except ValueError:
+        raise ResponseError(f"bad status line {status_line[:80]!r}")
+    headers = {}
+    for line in head.split(b"\r\n"):
+        name, _, value = line.partition(b":")
+        headers[name.strip().lower()] = value.strip().lower()
+    keep_alive = headers.get(b"connection") != b"close" \
+        and version == b"HTTP/1.1"
+
+    body = 0
+    if status in (204, 304) or 100 <= status < 200:
+        pass
+    elif b"chunked" in headers.get(b"transfer-encoding", b""):
+        while True:
+            size = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            if size == 0:
+                while await reader.readuntil(b"\r\n") != b"\r\n":
+                    pass   # trailers
+                break
+            await drain(reader, size + 2)
+            body += size
+    elif b"content-length" in headers:
+        body = int(headers[b"content-length"])
+        await drain(reader, body)
+    else:
+        while True:   # until the server closes the connection
+            data = await reader.read(READ_SIZE)
+            if not data:
+                break
+            body += len(data)
+        keep_alive = False
+    return status, body, first_byte, keep_alive
+
+
+class LoadRun:
+    def __init__(self, url, paths, connections, duration, rate=None,
+                 timeout=30.0):
+        parts = urlsplit(url)
+        self.host = parts.hostname or "127.0.0.1"
+        self.port = parts.port or 80
+        self.paths = paths
+        self.connections = connections
+        self.duration = duration
+        self.rate = rate
+        self.timeout = timeout
+        self.requests = [
+            (f"GET {path} HTTP/1.1\r\nHost: {self.host}:{self.port}\r\n"
+             f"Connection: keep-alive\r\n\r\n").encode() for path in paths]
+        self.latency = Histogram()
+        self.ttfb = Histogram()
+        self.statuses = {}
+        self.errors = {}
+        self.body_bytes = 0
+        self.sent = 0
+        self.connects = 0
+
+    async def run(self):
+        self.connect_slots = asyncio.Semaphore(CONNECT_CONCURRENCY)
+        self.queue = asyncio.Queue()
+        self.started = time.perf_counter()
+        self.deadline = self.started + self.duration
+        workers = [asyncio.create_task(self.connection(n))
+                   for n in range(self.connections)]
+        if self.rate:
+            await self.schedule()
+        await asyncio.gather(*workers)
+        self.elapsed = time.perf_counter() - self.started
+
+    async def schedule(self):
+        """Fixed rate: queue the due time of every request."""
+        issued = 0
+        while True:
+            now = time.perf_counter()
+            if now >= self.deadline:
+                break
+            due = int((now - self.started) * self.rate) + 1
+            for n in range(issued, due):
+                self.queue.put_nowait(self.started + n / self.rate)
+            issued = due
+            await asyncio.sleep(min(0.001, self.deadline - now))
+        for _ in range(self.connections):
+            self.queue.put_nowait(None)
+
+    async def next_request(self):
+        """When the next request is due, or None to stop."""
+        if self.rate:
+            return await self.queue.get()
+        now = time.perf_counter()
+        return now if now < self.deadline else None
+
+    async def connect(self):
+        async with self.connect_slots:
+            self.connects += 1
+            return await asyncio.open_connection(self.host, self.port)
+
+    async def connection(self, number):
+        reader = writer = None
+        n = number
+        while True:
+            due = await self.next_request()
+            if due is None:
+                break
+            request = self.requests[n % len(self.requests)]
+            n += self.connections
+            try:
+                if writer is None:
+                    reader, writer = await asyncio.wait_for(
+                        self.connect(), self.timeout)
+                writer.write(request)
+                self.sent += 1
+                status, body, first_byte, keep_alive = \
+                    await asyncio.wait_for(read_response(reader),
+                                           self.timeout)
+                done = time.perf_counter()
+                self.latency.add(done - due)
+                self.ttfb.add(first_byte - due)
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+                self.body_bytes += body
+            except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                    asyncio.LimitOverrunError, ResponseError, ValueError) as e:
+                name = type(e).__name__
+                self.errors[name] = self.errors.get(name, 0) + 1
+                keep_alive = False
+            if not keep_alive and writer is not None:
+                writer.close()
+                reader = writer = None
+        if writer is not None:
+            writer.close()
+
+    def results(self):
+        elapsed = max(self.elapsed, 1e-9)
+        done = self.latency.total
+        return {
+            "meta": {
+                "date": datetime.now(timezone.utc).isoformat(
+                    timespec="seconds"),
+                "url": f"http://{self.host}:{self.port}",
+                "paths": self.paths,
+                "mode": "fixed-rate" if self.rate else "closed-loop",
+                "rate": self.rate,
+                "connections": self.connections,
+                "duration_s": self.duration,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+            },
+            "elapsed_s": round(elapsed, 3),
+            "requests": done,
+            "sent": self.sent,
+            "connects": self.connects,
+            "errors": self.errors,
+            "status": {str(k): v for k, v in sorted(self.statuses.items())},
+            "requests_per_s": round(done / elapsed, 1),
+            "body_bytes": self.body_bytes,
+            "mb_per_s": round(self.body_bytes / elapsed / 1e6, 2),
+            "latency_ms": self.latency.summary(),
+            "ttfb_ms": self.ttfb.summary(),
+        }
+
+
+def raise_fd_limit(needed):
+    """Make room for `needed` sockets if the hard limit allows it."""
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    want = needed + 64
+    if soft != resource.RLIM_INFINITY and soft < want:
+        if hard != resource.RLIM_INFINITY:
+            want = min(want, hard)
+        resource.setrlimit(resource.RLIMIT_NOFILE, (want, hard))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Put HTTP load on the local Node servers and report "
+                    "latency percentiles, TTFB and throughput as JSON.")
+    parser.add_argument("--url", default=DEFAULT_URL,
+                        help=f"server address (default {DEFAULT_URL})")
+    parser.add_argument("--paths", default="/",
+                        help="comma separated paths, cycled through "
+                             "(default /)")
+    parser.add_argument("-c", "--connections", type=int, default=100,
+                        help="concurrent keep-alive connections "
+                             "(default 100)")
+    parser.add_argument("-d", "--duration", type=float, default=10.0,
+                        help="seconds to send requests for (default 10)")
+    parser.add_argument("--rate", type=float,
+                        help="fixed total requests per second instead of "
+                             "closed loop")
+    parser.add_argument("--timeout", type=float, default=30.0,
+                        help="seconds per connect and per response "
+                             "(default 30)")
+    parser.add_argument("-o", "--output",
+                        help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+    if args.connections < 1 or args.duration <= 0 \
+            or (args.rate is not None and args.rate <= 0):
+        parser.error("--connections, --duration and --rate must be positive")
+
+    raise_fd_limit(args.connections)
+    run = LoadRun(args.url, args.paths.split(","), args.connections,
+                  args.duration, args.rate, args.timeout)
+    asyncio.run(run.run())
+    results = run.results()
+
+    text = json.dumps(results, indent=2)
+    print(text)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    if not results["requests"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""
+Throughput benchmark for generate_big_file.py
+
+Runs the generator as a subprocess for every combination of record count,
+format and worker count, and records records/s, MB/s, peak RSS and CPU
+time (user + sys, including worker processes) of the best of --repeat
+runs. Results are written as JSON and can be compared with a saved
+baseline; any metric outside its tolerance, or a baseline case that was
+not run, is a regression and the script exits with status 1. Cases the
+baseline does not have are listed.
+
+Usage:
+    python bench_generator.py --save-baseline bench_baseline.json
+    python bench_generator.py --baseline bench_baseline.json
+    python bench_generator.py --records 1000000 --formats ndjson,csv \\
+        --workers 1,4 --tolerance 0.1 --tolerance peak_rss_kb=0.25
+
+Needs nothing but the standard library and a Unix-like OS (os.wait4).
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+GENERATOR = os.path.join(HERE, "generate_big_file.py")
+
+# metric -> True when higher is better
+METRICS = {
+    "records_per_s": True,
+    "mb_per_s": True,
+    "peak_rss_kb": False,
+    "cpu_s": False,
+}
+DEFAULT_TOLERANCE = 0.10
+
+
+def run_case(records, fmt, workers, extra_args, tmpdir):
+    """Run the generator once; return wall time, rusage and output size."""
+    output = os.path.join(tmpdir, f"bench.{fmt}")
+    cmd = [sys.executable, GENERATOR, "--records", str(records),
+           "--format", fmt, "--workers", str(workers), "-o", output,
+           *extra_args]
+    started = time.perf_counter()
+    proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL)
+    # wait4 instead of proc.wait(): it also returns the rusage of this one
+    # child (and the worker processes it waited for)
+    _, status, usage = os.wait4(proc.pid, 0)
+    wall = time.perf_counter() - started
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise RuntimeError(f"generator failed ({proc.returncode}): "
+                           f"{' '.join(cmd)}")
+    size = os.path.getsize(output)
+    for name in os.listdir(tmpdir):
+        os.remove(os.path.join(tmpdir, name))
+    return wall, usage, size
+
+
+def bench(records_list, formats, workers_list, repeat, extra_args, tmpdir):
+    results = []
+    for records in records_list:
+        for fmt in formats:
+            for workers in workers_list:
+                runs = [run_case(records, fmt, workers, extra_args, tmpdir)
+                        for _ in range(repeat)]
+                wall, usage, size = min(runs, key=lambda run: run[0])
+                result = {
+                    "name": f"{fmt}-r{records}-w{workers}",
+                    "format": fmt,
+                    "records": records,
+                    "workers": workers,
+                    "bytes": size,
+                    "wall_s": round(wall, 4),
+                    "records_per_s": round(records / wall, 1),
+                    "mb_per_s": round(size / wall / 1e6, 2),
+                    "peak_rss_kb": usage.ru_maxrss,
+                    "cpu_s": round(usage.ru_utime + usage.ru_stime, 4),
+                }
+                print(f"{result['name']:<28} "
+                      f"{result['records_per_s']:>12,.0f} rec/s "
+                      f"{result['mb_per_s']:>8,.1f} MB/s "
+                      f"{result['peak_rss_kb'] / 1024:>7,.1f} MB RSS "
+                      f"{result['cpu_s']:>7.2f} s CPU")
+                results.append(result)
+    return results
+
+
+# regression(), new_cases() and parse_tolerances() are the same in
+# event-loops/profile_docs.py; keep the two in step.
+
+def regression(name, metric, old, new, higher_is_better, tolerance,
+               floor=0):
+    """The message when new is worse than old by more than tolerance (a
+    fraction of old) and by more than floor; None otherwise."""
+    if not old or new is None or abs(new - old) <= floor:
+        return None
+    change = (new - old) / old
+    worse = -change if higher_is_better else change
+    if worse <= tolerance:
+        return None
+    return (f"{name}: {metric} {old} -> {new} "
+            f"({change:+.1%}, tolerance {tolerance:.0%})")
+
+
+def new_cases(names, known):
+    """The names that are not among known, in order."""
+    return [name for name in names if name not in known]
+
+
+def compare(results, baseline, tolerances):
+    """Return a list of regression messages (empty when all is well); a
+    baseline case this run did not measure is one."""
+    previous = {r["name"]: r for r in baseline["results"]}
+    current = {r["name"]: r for r in results}
+    regressions = [f"{name}: in the baseline but not in this run"
+                   for name in new_cases(previous, current)]
+    for name, result in current.items():
+        before = previous.get(name)
+        if before is None:
+            continue
+        for metric, higher_is_better in METRICS.items():
+            message = regression(
+                name, metric, before.get(metric), result.get(metric),
+                higher_is_better, tolerances.get(metric, tolerances["*"]))
+            if message:
+                regressions.append(message)
+    return regressions
+
+
+def parse_tolerances(values):
+    tolerances = {"*": DEFAULT_TOLERANCE}
+    for value in values:
+        metric, _, amount = value.rpartition("=")
+        if metric and metric not in METRICS:
+            raise argparse.ArgumentTypeError(f"unknown metric {metric!r}")
+        tolerances[metric or "*"] = float(amount)
+    return tolerances
+
+
+def int_list(text):
+    return [int(v) for v in text.split(",")]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Benchmark generate_big_file.py and compare with a "
+                    "baseline.")
+    parser.add_argument("--records", type=int_list, default=[100_000,
+                                                             1_000_000],
+                        help="comma separated record counts")
+    parser.add_argument("--formats", default="ndjson,csv,frames,columnar",
+                        help="comma separated formats")
+    parser.add_argument("--workers", type=int_list, default=[1, 2],
+                        help="comma separated worker counts")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="runs per case, the fastest is kept")
+    parser.add_argument("--generator-args", default="",
+                        help="extra arguments for every generator run, "
+                             "e.g. '--background-writer'")
+    parser.add_argument("--tmpdir", help="where fixtures are written "
+                                         "(default: system temp dir)")
+    parser.add_argument("-o", "--output", default="bench_results.json",
+                        help="results file (default bench_results.json)")
+    parser.add_argument("--baseline", help="compare with this results file")
+    parser.add_argument("--save-baseline", metavar="FILE",
+                        help="also save the results as a baseline")
+    parser.add_argument("--tolerance", action="append", default=[],
+                        metavar="[METRIC=]FRACTION",
+                        help=f"allowed relative regression (default "
+                             f"{DEFAULT_TOLERANCE}); repeat per metric: "
+                             f"{', '.join(METRICS)}")
+    args = parser.parse_args(argv)
+    try:
+        tolerances = parse_tolerances(args.tolerance)
+    except (argparse.ArgumentTypeError, ValueError) as e:
+        parser.error(str(e))
+
+    tmpdir = tempfile.mkdtemp(prefix="bench_generator_", dir=args.tmpdir)
+    try:
+        results = bench(args.records, args.formats.split(","), args.workers,
+                        args.repeat, args.generator_args.split(), tmpdir)
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "generator_args": args.generator_args,
+            "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    print(f"Results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        for name in new_cases([r["name"] for r in results],
+                              {r["name"] for r in baseline["results"]}):
+            print(f"note: {name} is new, not in the baseline")
+        regressions = compare(results, baseline, tolerances)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,334 @@
+"""
+Python twin of FilterActiveUsersTransform (streams/transform-streams)
+
+Keeps the records of an NDJSON file whose isActive is true and writes them
+the way the Node transform does: JSON.parse(line), then
+JSON.stringify(json) + "\\n" - compact, no spaces. The output is meant to be
+byte-identical to the Node pipeline, so it can be used as a correctness
+oracle and as a speed bar for it.
+
+The file is memory-mapped and processed in line-aligned slices, searched
+in place without copying them out. One regex findall picks out the
+active records in the layout generate_big_file.py writes; their compact
+form is a plain byte template. A line without a `true` byte string
+cannot be active, so when the slice has no `true` beyond those records
+nothing else is looked at. Otherwise only the lines between the records
+that do have one fall back to json.loads and a JSON.stringify
+equivalent.
+
+Note: the Node transform decodes each 16 KiB chunk separately, so a
+multibyte UTF-8 character split across two chunks turns into U+FFFD there.
+This script decodes whole lines and shows what the output should be.
+
+--self-check runs filter_line() on SELF_CHECK, lines whose output was
+taken from Node, and fails on any difference.
+
+Usage:
+    python filter_active_users.py huge_data.json -o active_users.json
+    python filter_active_users.py huge_data.json --workers 4 -o -
+    python filter_active_users.py --self-check
+"""
+
+import argparse
+import json
+import math
+import mmap
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+SLICE_SIZE = 16 << 20
+
+# One generator record per line. Strings are printable ASCII without
+# escapes and ids are exact in a double, so the compact form is a pure
+# byte rewrite. The match starts at the newline before the line (a
+# literal prefix, which the regex engine searches for quickly, unlike ^)
+# and leaves the newline after it to the next one.
+_ID = rb"(0|-?[1-9][0-9]{0,14})"
+_STR = rb'"([\x20\x21\x23-\x5b\x5d-\x7e]*)"'
+ACTIVE_LINE = re.compile(
+    rb'\n\{"id": ' + _ID + rb', "username": ' + _STR + rb', "email": '
+    + _STR + rb', "isActive": true, "createdAt": ' + _STR + rb'\}(?=\n)')
+TRUE = re.compile(rb"true")
+ACTIVE_COMPACT = (b'{"id":%s,"username":"%s","email":"%s",'
+                  b'"isActive":true,"createdAt":"%s"}\n')
+SURROGATE = re.compile("[\ud800-\udfff]")
+ARRAY_INDEX = re.compile(r"0|[1-9][0-9]{0,9}")
+MAX_ARRAY_INDEX = 2 ** 32 - 2
+MAX_SAFE_INTEGER = 2 ** 53
+
+# input line -> output of the Node transform (None: dropped)
+SELF_CHECK = [
+    ('{"id": 1, "username": "a", "email": "b", "isActive": true, '
+     '"createdAt": "c"}',
+     '{"id":1,"username":"a","email":"b","isActive":true,"createdAt":"c"}'),
+    ('{"id": 2, "isActive": false}', None),
+    ('{"isActive": "true"}', None),
+    ('[true]', None),
+    ('{"isActive": true', None),   # cut off
+    ('{"isActive": true, "x": 1.50, "y": -0.0, "z": 1e21}',
+     '{"isActive":true,"x":1.5,"y":0,"z":1e+21}'),
+    ('{"isActive": true, "x": 1e-7, "y": 0.000001, "z": 123456789e-30}',
+     '{"isActive":true,"x":1e-7,"y":0.000001,"z":1.23456789e-22}'),
+    ('{"isActive": true, "n": 123456789012345678901234567890}',
+     '{"isActive":true,"n":1.2345678901234568e+29}'),
+    ('{"isActive": true, "x": 1e400, "y": -1e400}',
+     '{"isActive":true,"x":null,"y":null}'),
+    ('{"isActive": true, "n": 1' + '0' * 400 + '}',
+     '{"isActive":true,"n":null}'),
+    ('{"isActive": true, "s": "\\ud800 \\u00e9 \\"/"}',
+     '{"isActive":true,"s":"\\ud800 \u00e9 \\"/"}'),
+    ('{"isActive": true, "b": 1, "1": 2}',
+     '{"1":2,"isActive":true,"b":1}'),
+    ('{"isActive": true, "10": 0, "01": 0, "2": 0, "-1": 0, "1.5": 0, '
+     '"4294967294": 0, "o": {"z": 0, "0": 0}}',
+     '{"2":0,"10":0,"4294967294":0,"isActive":true,"01":0,"-1":0,'
+     '"1.5":0,"o":{"0":0,"z":0}}'),
+]
+
+
+def js_number(value):
+    """Number.prototype.toString() for a JSON number."""
+    if isinstance(value, int):
+        if abs(value) <= MAX_SAFE_INTEGER:
+            return str(value)
+        try:
+            value = float(value)
+        except OverflowError:
+            return "null"   # beyond a double: Infinity in JS
+    if not math.isfinite(value):
+        return "null"   # JSON.stringify(Infinity)
+    if value == 0:
+        return "0"
+    if value < 0:
+        return "-" + js_number(-value)
+    # shortest round-trip digits, as ECMAScript asks for: value is
+    # 0.digits * 10 ** n
+    _, digits, exponent = Decimal(repr(value)).as_tuple()
+    padded = "".join(map(str, digits))
+    digits = padded.rstrip("0")
+    exponent += len(padded) - len(digits)
+    k = len(digits)
+    n = exponent + k
+    if k <= n <= 21:
+        return digits + "0" * (n - k)
+    if 0 < n <= 21:
+        return digits[:n] + "." + digits[n:]
+    if -6 < n <= 0:
+        return "0." + "0" * -n + digits
+    e = n - 1
+    mantissa = digits if k == 1 else digits[0] + "." + digits[1:]
+    return f"{mantissa}e{'+' if e >= 0 else '-'}{abs(e)}"
+
+
+def js_string(value):
+    text = json.dumps(value, ensure_ascii=False)
+    if SURROGATE.search(text):
+        # JSON.stringify escapes lone surrogates instead of failing
+        text = SURROGATE.sub(lambda m: "\\u%04x" % ord(m.group()), text)
+    return text
+
+
+def js_stringify(value):
+    """JSON.stringify() for a value that came out of json.loads()."""
+    if value is True:
+        return "true"
+    if value is False:
+        return "false"
+    if value is None:
+        return "null"
+    if isinstance(value, str):
+        return js_string(value)
+    if isinstance(value, (int, float)):
+        return js_number(value)
+    if isinstance(value, list):
+        return "[" + ",".join(map(js_stringify, value)) + "]"
+    return "{" + ",".join(js_string(k) + ":" + js_stringify(value[k])
+                          for k in js_keys(value)) + "}"
+
+
+def js_keys(obj):
+    """The keys of obj in the order of a JS object: array indices
+    (canonical integer strings below 2 ** 32 - 1) ascending, then the
+    others as they were added."""
+    indices = [k for k in obj if ARRAY_INDEX.fullmatch(k)
+               and int(k) <= MAX_ARRAY_INDEX]
+    if not indices:
+        return obj.keys()
+    indices.sort(key=int)
+    found = set(indices)
+    return indices + [k for k in obj if k not in found]
+
+
+def _reject_constant(name):
+    raise ValueError(f"{name} is not JSON")   # JSON.parse rejects NaN etc.
+
+
+def filter_line(line):
+    """Output for one line (without its newline), or None."""
+    text = line.decode("utf-8", "replace")
+    if not text.strip():
+        return None
+    try:
+        record = json.loads(text, parse_constant=_reject_constant)
+    except ValueError:
+        return None   # the Node transform logs and skips these
+    if isinstance(record, dict) and record.get("isActive") is True:
+        return (js_stringify(record) + "\n").encode("utf-8", "surrogatepass")
+    return None
+
+
+def filter_gap(buf, start, end, out):
+    """Append the output of the lines of buf[start:end] that hold a
+    `true`; start is the start of a line."""
+    found = buf.find(b"true", start, end)
+    while found >= 0:
+        first = buf.rfind(b"\n", start, found) + 1 or start
+        last = buf.find(b"\n", found, end)
+        if last < 0:
+            last = end
+        result = filter_line(buf[first:last])
+        if result is not None:
+            out.append(result)
+        found = buf.find(b"true", last, end)
+
+
+def filter_slice(buf, start=0, end=None):
+    """Filter the whole lines of buf[start:end] (the last one may lack its
+    newline). buf may be a mmap; it is searched in place."""
+    end = len(buf) if end is None else end
+    out = []
+    if start == 0:
+        # no newline before the first line for ACTIVE_LINE
+        start = buf.find(b"\n", 0, end) + 1 or end
+        filter_gap(buf, 0, start, out)
+    records = ACTIVE_LINE.findall(buf, start - 1, end)
+    if len(TRUE.findall(buf, start, end)) == len(records):
+        # every `true` is the isActive of a record
+        out += [ACTIVE_COMPACT % record for record in records]
+        return b"".join(out)
+
+    pos = start
+    for match in ACTIVE_LINE.finditer(buf, start - 1, end):
+        if match.start() + 1 > pos:
+            filter_gap(buf, pos, match.start() + 1, out)
+        out.append(ACTIVE_COMPACT % match.groups())
+        pos = match.end() + 1
+    if pos < end:
+        filter_gap(buf, pos, end, out)
+    return b"".join(out)
+
+
+def self_check():
+    """Messages for the SELF_CHECK lines filter_line() gets wrong."""
+    failed = []
+    for line, expected in SELF_CHECK:
+        result = filter_line(line.encode("utf-8"))
+        if expected is not None:
+            expected = (expected + "\n").encode("utf-8", "surrogatepass")
+        if result != expected:
+            failed.append(f"{line[:60]}: expected {expected!r}, "
+                          f"got {result!r}")
+    return failed
+
+
+def line_ranges(mm, slice_size=SLICE_SIZE):
+    """Cut a mapped file into (start, end) ranges ending after a newline."""
+    size = len(mm)
+    start = 0
+    while start < size:
+        end = min(size, start + slice_size)
+        if end < size:
+            newline = mm.find(b"\n", end)
+            end = size if newline < 0 else newline + 1
+        yield start, end
+        start = end
+
+
+def filter_range(path, start, end):
+    """Worker task: filter bytes start..end of path."""
+    with open(path, "rb") as f, \
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return filter_slice(mm, start, end)
+
+
+def filter_file(path, out, workers=1, slice_size=SLICE_SIZE):
+    """Write the active records of path to the binary file out.
+
+    Returns (bytes read, bytes written).
+    """
+    written = 0
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0, 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            ranges = line_ranges(mm, slice_size)
+            if workers <= 1:
+                for start, end in ranges:
+                    data = filter_slice(mm, start, end)
+                    out.write(data)
+                    written += len(data)
+                return size, written
+
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                pending = []
+
+                def submit():
+                    span = next(ranges, None)
+                    if span is not None:
+                        pending.append(pool.submit(filter_range, path, *span))
+
+                for _ in range(workers * 2):
+                    submit()
+                while pending:
+                    data = pending.pop(0).result()
+                    submit()
+                    out.write(data)
+                    written += len(data)
+    return size, written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Keep the isActive: true records of an NDJSON file, "
+                    "like FilterActiveUsersTransform.")
+    parser.add_argument("input", nargs="?", default="huge_data.json")
+    parser.add_argument("-o", "--output", default="active_users.json",
+                        help="output file, '-' for stdout "
+                             "(default active_users.json)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="processes, each filtering line-aligned "
+                             "slices (0 = one per CPU)")
+    parser.add_argument("--self-check", action="store_true",
+                        help="compare the output of SELF_CHECK lines with "
+                             "Node's and exit")
+    args = parser.parse_args(argv)
+    if args.self_check:
+        failed = self_check()
+        for message in failed:
+            print(f"FAIL {message}")
+        print(f"{len(SELF_CHECK) - len(failed)}/{len(SELF_CHECK)} lines "
+              f"match Node")
+        sys.exit(1 if failed else 0)
+    workers = args.workers or os.cpu_count() or 1
+
+    started = time.perf_counter()
+    if args.output == "-":
+        out = open(sys.stdout.fileno(), "wb", closefd=False)
+    else:
+        out = open(args.output, "wb")
+    with out:
+        read, written = filter_file(args.input, out, workers)
+    elapsed = max(time.perf_counter() - started, 1e-9)
+
+    log = sys.stderr if args.output == "-" else sys.stdout
+    print(f"Filtered {read:,} bytes into {written:,} bytes in "
+          f"{elapsed:.2f}s, {read / elapsed / 1e9:.3f} GB/s", file=log)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Content-addressed fixture cache for generate_big_file.py (--cache DIR)
+
+A fixture is fully determined by the generator parameters (format, record
+count, schema and its seed, compression, ...), so the cache keys entries
+by a hash of them. Each entry is a directory <key>/ with the data file and
+meta.json (the parameters and the stats of the run that produced it).
+
+A hit puts the stored file at the output path as a reflink (a
+copy-on-write clone, where the filesystem supports it) or else a hard
+link, so a warm fixture costs a few syscalls however large it is. The
+output of a hard link shares the cached inode: open_output() and
+detach() make sure the generator never writes through such a link.
+
+Entries are built in a temporary directory inside the cache and renamed
+into place, so a concurrent job sees a complete entry or none. The mtime
+of meta.json records the last use; once the entries exceed the disk
+budget the least recently used ones are removed.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+CACHE_VERSION = 1          # bump when the generator's output changes
+DATA = "data"
+META = "meta.json"
+FICLONE = 0x40049409       # linux/fs.h: _IOW(0x94, 9, int)
+
+
+def cache_key(params):
+    """Hex digest of the parameters that determine a fixture's bytes."""
+    text = json.dumps({"version": CACHE_VERSION, **params}, sort_keys=True,
+                      separators=(",", ":"))
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+def clone(src, dst):
+    """Put a copy of src at dst: reflink, hard link or plain copy.
+
+    dst is replaced atomically. Returns the method that worked.
+    """
+    if os.path.exists(dst) and os.path.samefile(src, dst):
+        # already linked; rename() onto the same inode would do nothing
+        return "hardlink"
+    tmp = f"{dst}.tmp-{os.getpid()}"
+    try:
+        with open(src, "rb") as fin, open(tmp, "wb") as fout:
+            fcntl.ioctl(fout.fileno(), FICLONE, fin.fileno())
+        method = "reflink"
+    except OSError:
+        _remove(tmp)
+        try:
+            os.link(src, tmp)
+            method = "hardlink"
+        except OSError:   # e.g. another filesystem
+            shutil.copyfile(src, tmp)
+            method = "copy"
+    os.replace(tmp, dst)
+    return method
+
+
+def detach(path):
+    """Give path its own inode if it is a hard link (e.g. into the cache).
+
+    Called before a file is modified in place, so the other names keep
+    their contents.
+    """
+    try:
+        if os.stat(path).st_nlink < 2:
+            return
+    except FileNotFoundError:
+        return
+    tmp = f"{path}.tmp-{os.getpid()}"
+    shutil.copyfile(path, tmp)
+    os.replace(tmp, path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class FixtureCache:
+    """The cache directory root, holding at most budget bytes of data."""
+
+    def __init__(self, root, budget=None):
+        self.root = root
+        self.budget = budget
+        os.makedirs(root, exist_ok=True)
+
+    def entry(self, key):
+        return os.path.join(self.root, key)
+
+    def lookup(self, key, output_file):
+        """Clone a cached fixture to output_file.
+
+        Returns (stats, method), or None on a miss.
+        """
+        entry = self.entry(key)
+        try:
+            with open(os.path.join(entry, META), encoding="utf-8") as f:
+                meta = json.load(f)
+            method = clone(os.path.join(entry, DATA), output_file)
+            os.utime(os.path.join(entry, META))
+        except FileNotFoundError:
+            return None   # not cached, or evicted under our feet
+        return meta["stats"], method
+
+    def store(self, key, params, produce):
+        """Run produce(path) to build an entry; returns its stats.
+
+        produce writes the fixture to path and returns the generator
+        stats. If a concurrent job stored the same key first, its entry
+        is kept and ours is discarded (the bytes are the same).
+        """
+        tmp = tempfile.mkdtemp(prefix=".tmp-", dir=self.root)
+        try:
+            stats = produce(os.path.join(tmp, DATA))
+            with open(os.path.join(tmp, META), "w", encoding="utf-8") as f:
+                json.dump({"params": params, "stats": stats}, f, indent=2,
+                          sort_keys=True)
+                f.write("\n")
+            try:
+                os.rename(tmp, self.entry(key))
+            except OSError:
+                pass   # already there
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self.evict(keep=key)
+        return stats
+
+    def entries(self):
+        """(last use, size, key) of every complete entry."""
+        found = []
+        for key in os.listdir(self.root):
+            if key.startswith("."):
+                continue
+            entry = self.entry(key)
+            try:
+                used = os.stat(os.path.join(entry, META)).st_mtime
+                size = os.stat(os.path.join(entry, DATA)).st_size
+            except FileNotFoundError:
+                continue
+            found.append((used, size, key))
+        return found
+
+    def evict(self, keep=None):
+        """Remove least recently used entries until within the budget."""
+        if self.budget is None:
+            return
+        found = sorted(self.entries())
+        total = sum(size for _, size, _ in found)
+        for _, size, key in found:
+            if total <= self.budget:
+                break
+            if key == keep:
+                continue
+            # rename first: the entry disappears at once for other jobs
+            trash = os.path.join(self.root, f".trash-{key}-{os.getpid()}")
+            try:
+                os.rename(self.entry(key), trash)
+            except OSError:
+                continue   # removed by a concurrent job
+            shutil.rmtree(trash, ignore_errors=True)
+            total -= size
@@ -0,0 +1,124 @@
+"""
+Resume / append support for generate_big_file.py
+
+While a file is being generated, <output>.ckpt holds the parameters of
+the run (format, schema, target record count). It is removed when the run
+finishes, so a leftover checkpoint means the run was interrupted.
+
+The file itself is the progress record: find_resume_point() reads the
+tail backwards to the last newline, cuts off a torn last line and reads
+the id of the last complete record, so generation continues from the next
+id without rewriting anything. Only line formats (ndjson, csv) can be
+resumed this way, and only uncompressed.
+"""
+
+import csv
+import json
+import os
+
+TAIL_CHUNK = 64 * 1024
+
+
+class ResumeError(RuntimeError):
+    pass
+
+
+def checkpoint_path(output_file):
+    return output_file + ".ckpt"
+
+
+def write_checkpoint(output_file, params):
+    """Atomically record the parameters of the run that writes output_file."""
+    path = checkpoint_path(output_file)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(params, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(tmp, path)
+
+
+def read_checkpoint(output_file):
+    try:
+        with open(checkpoint_path(output_file), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def clear_checkpoint(output_file):
+    try:
+        os.remove(checkpoint_path(output_file))
+    except FileNotFoundError:
+        pass
+
+
+def last_line_bounds(f, size):
+    """(start, end) of the last complete line in f, reading backwards.
+
+    end is just past its newline, so anything after it is a torn write.
+    Returns (0, 0) when the file has no complete line.
+    """
+    end = None
+    pos = size
+    while pos > 0:
+        read_from = max(0, pos - TAIL_CHUNK)
+        f.seek(read_from)
+        chunk = f.read(pos - read_from)
+        search_to = len(chunk)
+        while True:
+            newline = chunk.rfind(b"\n", 0, search_to)
+            if newline < 0:
+                break
+            if end is None:
+                end = read_from + newline + 1
+                search_to = newline
+                continue
+            return read_from + newline + 1, end
+        pos = read_from
+    return (0, end) if end is not None else (0, 0)
+
+
+def id_position(fmt, schema):
+    """Which value of a record holds its id, or None if it has none."""
+    if schema is None:
+        return "id" if fmt == "ndjson" else 0
+    for number, field in enumerate(schema["fields"]):
+        if field.get("type") == "id":
+            return field["name"] if fmt == "ndjson" else number
+    return None
+
+
+def count_lines(f, end):
+    f.seek(0)
+    lines = 0
+    while f.tell() < end:
+        lines += f.read(min(TAIL_CHUNK * 16, end - f.tell())).count(b"\n")
+    return lines
+
+
+def find_resume_point(output_file, fmt, schema=None, header=b""):
+    """Cut output_file after its last complete record.
+
+    Returns (last_id, size): the id of the last complete record (0 if there
+    is none) and the file size after the cut.
+    """
+    if fmt not in ("ndjson", "csv"):
+        raise ResumeError(f"cannot resume {fmt} output, only ndjson or csv")
+    with open(output_file, "r+b") as f:
+        size = f.seek(0, os.SEEK_END)
+        start, end = last_line_bounds(f, size)
+        if end < size:
+            f.truncate(end)
+        if end <= len(header):
+            # nothing but (part of) the header: start over
+            f.truncate(0)
+            return 0, 0
+
+        position = id_position(fmt, schema)
+        if position is None:
+            return count_lines(f, end) - (1 if header else 0), end
+        f.seek(start)
+        line = f.read(end - start).decode()
+        if fmt == "ndjson":
+            return int(json.loads(line)[position]), end
+        return int(next(csv.reader([line]))[position]), end
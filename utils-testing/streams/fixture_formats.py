@@ -0,0 +1,253 @@
+"""
+Output formats for generate_big_file.py
+
+All formats carry the records described in fixture_records.py:
+
+    ndjson    one JSON object per line (the original huge_data.json)
+    csv       header line, then one comma separated row per record
+    frames    u32 little-endian length + the JSON object, no newline
+    columnar  row groups of fixed-width arrays plus a string heap
+
+Each format is an encoder `encode(first_id, stop_id) -> bytes`, an exact
+size formula used by --target-bytes, and a layout entry for the manifest.
+"""
+
+import json
+import sys
+from array import array
+
+from fixture_records import (FIELDS, IS_ACTIVE, START_EPOCH, digits_total,
+                             json_record, odd_count, timestamp_runs)
+
+# Same bytes json.dumps produces for one record, with the variable parts
+# left as %-placeholders so a record is one string format instead of a
+# dict build + json.dumps + timedelta + isoformat.
+LINE_TEMPLATE = (
+    '{"id": %d, "username": "user_%d", "email": "user_%d@example.com", '
+    '"isActive": %s, "createdAt": "%s%sZ"}\n'
+)
+CSV_HEADER = b"id,username,email,isActive,createdAt\n"
+CSV_TEMPLATE = "%d,user_%d,user_%d@example.com,%s,%s%sZ\n"
+
+# Record lengths without the three copies of the id, for an even id; odd
+# ids add one byte ("false" vs "true"). The date is fixed width.
+LINE_BASE_LENGTH = len(LINE_TEMPLATE % (0, 0, 0, "true", "2025-01-01T",
+                                        "00:00:00")) - 3
+CSV_BASE_LENGTH = len(CSV_TEMPLATE % (0, 0, 0, "true", "2025-01-01T",
+                                      "00:00:00")) - 3
+FRAME_BASE_LENGTH = 4 + LINE_BASE_LENGTH - 1
+
+# Columnar row group, little-endian, every group starts 8-byte aligned:
+#   "COLG", rows u32, heap bytes u32, reserved u32
+#   id u64[rows], createdAt i64[rows] (unix seconds),
+#   username_end u32[rows], email_end u32[rows], isActive u8[rows],
+#   heap (all usernames, then all emails), zero padding to 8 bytes
+# username i is heap[username_end[i-1]:username_end[i]] (0 for i = 0),
+# email i is heap[email_end[i-1]:email_end[i]] (username_end[-1] for i = 0).
+GROUP_MAGIC = b"COLG"
+GROUP_HEADER_LENGTH = 16
+USERNAME_BASE_LENGTH = len("user_")
+EMAIL_BASE_LENGTH = len("user_@example.com")
+
+
+def encode_ndjson(first_id, stop_id):
+    """Encode records first_id..stop_id-1 as NDJSON lines in one block."""
+    return "".join([
+        LINE_TEMPLATE % (n, n, n, IS_ACTIVE[n & 1], prefix, t)
+        for start, end, prefix, times in timestamp_runs(first_id, stop_id)
+        for n, t in zip(range(start, end), times)
+    ]).encode()
+
+
+def encode_ndjson_reference(first_id, stop_id):
+    """The original per-record json.dumps loop, kept as the slow baseline."""
+    return "".join([json_record(i) for i in range(first_id, stop_id)]).encode()
+
+
+def encode_csv(first_id, stop_id):
+    return "".join([
+        CSV_TEMPLATE % (n, n, n, IS_ACTIVE[n & 1], prefix, t)
+        for start, end, prefix, times in timestamp_runs(first_id, stop_id)
+        for n, t in zip(range(start, end), times)
+    ]).encode()
+
+
+def encode_frames(first_id, stop_id):
+    parts = []
+    append = parts.append
+    for start, end, prefix, times in timestamp_runs(first_id, stop_id):
+        for n, t in zip(range(start, end), times):
+            payload = (LINE_TEMPLATE % (n, n, n, IS_ACTIVE[n & 1], prefix, t)
+                       )[:-1].encode()
+            append(len(payload).to_bytes(4, "little"))
+            append(payload)
+    return b"".join(parts)
+
+
+def encode_columnar(first_id, stop_id):
+    """One row group for ids first_id..stop_id-1."""
+    ids = range(first_id, stop_id)
+    usernames = "".join([f"user_{n}" for n in ids]).encode()
+    emails = "".join([f"user_{n}@example.com" for n in ids]).encode()
+
+    username_end = array("I")
+    end = 0
+    for n in ids:
+        end += USERNAME_BASE_LENGTH + len(str(n))
+        username_end.append(end)
+    # email k = username k + the "@example.com" tail, stored after usernames
+    tail = EMAIL_BASE_LENGTH - USERNAME_BASE_LENGTH
+    email_end = array("I", [len(usernames) + e + tail * k
+                            for k, e in enumerate(username_end, 1)])
+    id_column = array("Q", ids)
+    created_at = array("q", range(START_EPOCH + first_id,
+                                  START_EPOCH + stop_id))
+    if sys.byteorder == "big":
+        for column in (username_end, email_end, id_column, created_at):
+            column.byteswap()
+
+    heap_length = len(usernames) + len(emails)
+    padding = -(len(ids) + heap_length) % 8
+    return b"".join([
+        GROUP_MAGIC,
+        len(ids).to_bytes(4, "little"),
+        heap_length.to_bytes(4, "little"),
+        bytes(4),
+        id_column.tobytes(),
+        created_at.tobytes(),
+        username_end.tobytes(),
+        email_end.tobytes(),
+        bytes(n & 1 ^ 1 for n in ids),
+        usernames,
+        emails,
+        bytes(padding),
+    ])
+
+
+def columnar_group_size(first_id, stop_id):
+    rows = stop_id - first_id
+    heap = (USERNAME_BASE_LENGTH + EMAIL_BASE_LENGTH) * rows \
+        + 2 * digits_total(first_id, stop_id)
+    return GROUP_HEADER_LENGTH + 24 * rows + rows + heap \
+        + -(rows + heap) % 8
+
+
+def line_size(base_length):
+    def size(first_id, stop_id):
+        return base_length * (stop_id - first_id) \
+            + 3 * digits_total(first_id, stop_id) \
+            + odd_count(first_id, stop_id)
+    return size
+
+
+# encode: block encoder, size: exact bytes of a block, header: written once
+# before the first record, lines: newline-delimited (usable with the index)
+FORMATS = {
+    "ndjson": {
+        "encode": encode_ndjson,
+        "size": line_size(LINE_BASE_LENGTH),
+        "suffix": ".json",
+        "lines": True,
+        "layout": {
+            "record": "one JSON object per line, '\\n' terminated",
+            "encoding": "utf-8",
+            "fields": "as json.dumps writes them, with ', ' and ': '",
+        },
+    },
+    "csv": {
+        "encode": encode_csv,
+        "header": CSV_HEADER,
+        "size": line_size(CSV_BASE_LENGTH),
+        "suffix": ".csv",
+        "lines": True,
+        "layout": {
+            "header": CSV_HEADER.decode().strip().split(","),
+            "delimiter": ",",
+            "quoting": "none (no value contains a comma or quote)",
+            "boolean": "true / false",
+            "line_terminator": "\\n",
+        },
+    },
+    "frames": {
+        "encode": encode_frames,
+        "size": line_size(FRAME_BASE_LENGTH),
+        "suffix": ".frames",
+        "layout": {
+            "frame": "u32 little-endian payload length, then the payload",
+            "payload": "the ndjson line for the record without its '\\n'",
+        },
+    },
+    "columnar": {
+        "encode": encode_columnar,
+        "size": columnar_group_size,
+        "suffix": ".cols",
+        "layout": {
+            "byte_order": "little",
+            "row_group": "one per block of records, starts 8-byte aligned",
+            "group_header": [
+                {"name": "magic", "type": "bytes[4]", "value": "COLG"},
+                {"name": "rows", "type": "u32"},
+                {"name": "heap_bytes", "type": "u32"},
+                {"name": "reserved", "type": "u32"},
+            ],
+            "columns": [
+                {"name": "id", "type": "u64[rows]"},
+                {"name": "createdAt", "type": "i64[rows]",
+                 "unit": "unix seconds, UTC"},
+                {"name": "username_end", "type": "u32[rows]",
+                 "note": "end offset of each username in the heap"},
+                {"name": "email_end", "type": "u32[rows]",
+                 "note": "end offset of each email in the heap"},
+                {"name": "isActive", "type": "u8[rows]"},
+                {"name": "heap", "type": "bytes[heap_bytes]",
+                 "note": "all usernames, then all emails, utf-8"},
+                {"name": "padding", "type": "zero bytes to 8 alignment"},
+            ],
+        },
+    },
+}
+
+
+def records_size(fmt, n, block_records):
+    """Exact byte size of records 1..n in format fmt, without encoding them.
+
+    Line formats are a closed formula; columnar is summed per row group
+    because each group has its own header and padding.
+    """
+    spec = FORMATS[fmt]
+    size = len(spec.get("header", b""))
+    if fmt != "columnar":
+        return size + spec["size"](1, n + 1)
+    for first_id in range(1, n + 1, block_records):
+        size += spec["size"](first_id, min(first_id + block_records, n + 1))
+    return size
+
+
+def records_for_bytes(fmt, target_bytes, block_records):
+    """Largest record count whose output fits in target_bytes."""
+    # every format takes more than 40 bytes per record
+    low, high = 0, target_bytes // 40 + 1
+    while low < high:
+        mid = (low + high + 1) // 2
+        if records_size(fmt, mid, block_records) <= target_bytes:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+def write_manifest(path, fmt, stats, block_records, schema=None):
+    manifest = {
+        "format": fmt,
+        "records": stats["file_records"],
+        "bytes": stats["file_bytes"],
+        "compression": stats["compression"],
+        "block_records": block_records,
+        "fields": FIELDS if schema is None else schema["fields"],
+        "layout": FORMATS[fmt]["layout"],
+    }
+    if schema is not None:
+        manifest["schema"] = schema
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+        f.write("\n")
@@ -0,0 +1,108 @@
+"""
+Golden outputs written by generate_big_file.py --golden
+
+Checking the streams demos needs the expected output and checksums of a
+fixture. Reading a multi-GB file back for them doubles the I/O, so they
+are computed from the blocks on their way to the file instead:
+
+    <output>.golden.json   counts, sizes and sha256 of the file and of the
+                           expected active-users output
+    <output>.active.json   what transform-streams.ts should send for an
+                           ndjson fixture: the isActive records as compact
+                           JSON (filter_active_users.filter_slice)
+    <output>.records.b2    an 8-byte blake2b digest of every record line
+                           (without its newline), in file order
+
+The file hash is fed the very buffers that are written, so it covers the
+bytes on disk, header included.
+"""
+
+import hashlib
+import json
+
+from filter_active_users import filter_slice
+
+RECORD_DIGEST_SIZE = 8
+
+
+def golden_path(output_file):
+    return output_file + ".golden.json"
+
+
+def active_path(output_file):
+    return output_file + ".active.json"
+
+
+def record_hashes_path(output_file):
+    return output_file + ".records.b2"
+
+
+def record_digests(block):
+    """Concatenated digests of the lines of a block of whole lines."""
+    lines = block.split(b"\n")
+    lines.pop()   # after the last newline
+    return b"".join([hashlib.blake2b(line,
+                                     digest_size=RECORD_DIGEST_SIZE).digest()
+                     for line in lines])
+
+
+class GoldenWriter:
+    """Streams hashes and the expected filter output while a file is
+    written; close() writes the summary."""
+
+    def __init__(self, output_file, fmt):
+        self.output_file = output_file
+        self.fmt = fmt
+        self.file_hash = hashlib.sha256()
+        self.size = 0
+        self.records = 0
+        self.record_hashes = open(record_hashes_path(output_file), "wb")
+        self.active = None
+        if fmt == "ndjson":
+            self.active = open(active_path(output_file), "wb")
+            self.active_hash = hashlib.sha256()
+            self.active_records = 0
+            self.active_size = 0
+
+    def add_header(self, header):
+        self.file_hash.update(header)
+        self.size += len(header)
+
+    def add_block(self, block, records):
+        self.file_hash.update(block)
+        self.size += len(block)
+        self.records += records
+        self.record_hashes.write(record_digests(block))
+        if self.active:
+            active = filter_slice(block)
+            self.active.write(active)
+            self.active_hash.update(active)
+            self.active_records += active.count(b"\n")
+            self.active_size += len(active)
+
+    def close(self):
+        """Close the side files and write <output>.golden.json."""
+        self.record_hashes.close()
+        golden = {
+            "file": self.output_file,
+            "format": self.fmt,
+            "records": self.records,
+            "bytes": self.size,
+            "sha256": self.file_hash.hexdigest(),
+            "record_hashes": {
+                "file": record_hashes_path(self.output_file),
+                "algorithm": f"blake2b-{RECORD_DIGEST_SIZE * 8}",
+            },
+        }
+        if self.active:
+            self.active.close()
+            golden["active"] = {
+                "file": active_path(self.output_file),
+                "records": self.active_records,
+                "bytes": self.active_size,
+                "sha256": self.active_hash.hexdigest(),
+            }
+        with open(golden_path(self.output_file), "w", encoding="utf-8") as f:
+            json.dump(golden, f, indent=2)
+            f.write("\n")
+        return golden
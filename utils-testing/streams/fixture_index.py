@@ -0,0 +1,162 @@
+"""
+Byte-offset side index for the NDJSON fixtures made by generate_big_file.py
+
+The index stores the byte offset of every Nth record (ids 1, 1+N, 1+2N, ...)
+followed by the data file size, so record boundaries can be found without
+reading the data file. Layout (little-endian):
+
+    header   "NDXI", version u32, stride u64, records u64, data size u64
+    offsets  u64 * (ceil(records / stride) + 1)   last one == data size
+
+Usage:
+    python fixture_index.py huge_data.json --offset 123456
+    python fixture_index.py huge_data.json --split 8
+"""
+
+import argparse
+import mmap
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+
+MAGIC = b"NDXI"
+VERSION = 1
+HEADER = struct.Struct("<4sIQQQ")
+
+
+def index_path(data_path):
+    return data_path + ".idx"
+
+
+class IndexWriter:
+    """Collects one offset per stride records while the file is written.
+
+    Blocks come in whatever size the generator encodes them; the indexed
+    records inside a block are found by skipping lines from its start.
+    """
+
+    def __init__(self, path, stride, start=0):
+        self.path = path
+        self.stride = stride
+        self.offsets = array("Q")
+        self.records = 0
+        self.size = start   # bytes before the first record (csv header)
+
+    def add_block(self, block, records):
+        """Add a block of `records` whole lines, the next in the file."""
+        target = -self.records % self.stride   # line of the next entry
+        line = pos = 0
+        while target < records:
+            while line < target:
+                pos = block.find(b"\n", pos) + 1
+                line += 1
+            self.offsets.append(self.size + pos)
+            target += self.stride
+        self.size += len(block)
+        self.records += records
+
+    def close(self):
+        offsets = array("Q", self.offsets)
+        offsets.append(self.size)
+        if sys.byteorder == "big":
+            offsets.byteswap()
+        with open(self.path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, self.stride,
+                                self.records, self.size))
+            offsets.tofile(f)
+
+
+class FixtureIndex:
+    """Memory-mapped view of a data file and its side index."""
+
+    def __init__(self, data_path, idx_path=None):
+        self._idx_file = open(idx_path or index_path(data_path), "rb")
+        self._idx = mmap.mmap(self._idx_file.fileno(), 0,
+                              access=mmap.ACCESS_READ)
+        magic, version, self.stride, self.records, self.data_size = \
+            HEADER.unpack_from(self._idx)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"not a fixture index: {self._idx_file.name}")
+        self.offsets = memoryview(self._idx)[HEADER.size:].cast("Q")
+        if sys.byteorder == "big":
+            self.offsets = array("Q", self.offsets)
+            self.offsets.byteswap()
+
+        self._data_file = open(data_path, "rb")
+        self._data = mmap.mmap(self._data_file.fileno(), 0,
+                               access=mmap.ACCESS_READ)
+        if len(self._data) != self.data_size:
+            raise ValueError(f"{data_path} is {len(self._data)} bytes, "
+                             f"index expects {self.data_size}")
+
+    def close(self):
+        if isinstance(self.offsets, memoryview):
+            self.offsets.release()
+        self._idx.close()
+        self._idx_file.close()
+        self._data.close()
+        self._data_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def offset_of(self, record_id):
+        """Byte offset where record `record_id` (1-based) starts.
+
+        Jumps to the nearest indexed record and skips at most stride - 1
+        lines from there.
+        """
+        if not 1 <= record_id <= self.records:
+            raise IndexError(f"record id {record_id} out of range "
+                             f"1..{self.records}")
+        entry, skip = divmod(record_id - 1, self.stride)
+        pos = self.offsets[entry]
+        for _ in range(skip):
+            pos = self._data.find(b"\n", pos) + 1
+        return pos
+
+    def split(self, parts):
+        """Cut the file into `parts` line-aligned (start, end) byte ranges.
+
+        Each cut is snapped to the indexed record start nearest to the even
+        split point by binary search, so no data is read. Ranges are never
+        empty, so fewer than `parts` come back for tiny files.
+        """
+        offsets = self.offsets
+        last = len(offsets) - 1
+        cuts = [0]
+        for i in range(1, parts):
+            target = self.data_size * i // parts
+            j = min(bisect_left(offsets, target, 0, last), last)
+            if j > 0 and target - offsets[j - 1] < offsets[j] - target:
+                j -= 1
+            if cuts[-1] < offsets[j] < self.data_size:
+                cuts.append(offsets[j])
+        cuts.append(self.data_size)
+        return list(zip(cuts, cuts[1:]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Look up record offsets in a generated fixture.")
+    parser.add_argument("data_file")
+    parser.add_argument("--offset", type=int, metavar="ID",
+                        help="print the byte offset of record ID")
+    parser.add_argument("--split", type=int, metavar="M",
+                        help="print M line-aligned byte ranges")
+    args = parser.parse_args(argv)
+
+    with FixtureIndex(args.data_file) as index:
+        if args.offset is not None:
+            print(index.offset_of(args.offset))
+        if args.split:
+            for start, end in index.split(args.split):
+                print(f"{start}\t{end}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""
+Periodic JSON-lines metrics for generate_big_file.py (--metrics SECONDS)
+
+A daemon thread wakes up every interval and writes one line with the
+progress of the running generate() call to a file descriptor (stderr by
+default), e.g.
+
+    {"t": 2.0, "records": 1507328, "bytes": 200867840, "written": ...,
+     "records_per_s": 761856.0, "mb_per_s": 101.5, "avg_records_per_s": ...,
+     "avg_mb_per_s": ..., "write_s": 0.41, "rss_kb": 61440}
+
+records/bytes are done so far (bytes uncompressed, written as they went to
+the file), the *_per_s values are over the last interval and avg_* over
+the whole run. write_s is the time spent in the file's write() so far (by
+the writer thread with --background-writer), so a stall in writeback
+shows up as write_s growing while mb_per_s drops. With
+--background-writer, wait_s is the time the generator spent waiting for
+the writer thread.
+rss_kb is the resident set of the generator process (not its workers).
+The last line has "done": true.
+
+The generator only bumps counters in its stats dict once per chunk; the
+thread reads them, so nothing is done per record.
+"""
+
+import json
+import os
+import resource
+import threading
+import time
+
+PAGE_KB = os.sysconf("SC_PAGE_SIZE") // 1024 \
+    if hasattr(os, "sysconf") else 4
+
+
+def rss_kb():
+    """Current resident set size; the peak where /proc is missing."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * PAGE_KB
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+class MetricsReporter:
+    """Samples a generate() stats dict every interval seconds."""
+
+    def __init__(self, stats, interval=1.0, fd=2):
+        self.stats = stats
+        self.interval = interval
+        self.fd = fd
+        self.started = time.perf_counter()
+        self.last = (self.started, 0, 0)
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True,
+                                       name="fixture-metrics")
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.emit()
+
+    def sample(self):
+        now = time.perf_counter()
+        stats = self.stats
+        records, raw = stats["records"], stats["raw_bytes"]
+        then, last_records, last_raw = self.last
+        self.last = (now, records, raw)
+        span = max(now - then, 1e-9)
+        elapsed = max(now - self.started, 1e-9)
+        return {
+            "t": round(elapsed, 3),
+            "records": records,
+            "bytes": raw,
+            "written": stats["bytes"],
+            "records_per_s": round((records - last_records) / span, 1),
+            "mb_per_s": round((raw - last_raw) / span / 1e6, 2),
+            "avg_records_per_s": round(records / elapsed, 1),
+            "avg_mb_per_s": round(raw / elapsed / 1e6, 2),
+            "write_s": round(stats.get("write_seconds", 0.0), 4),
+            **({"wait_s": round(stats["wait_seconds"], 4)}
+               if "wait_seconds" in stats else {}),
+            "rss_kb": rss_kb(),
+        }
+
+    def emit(self, **extra):
+        line = json.dumps({**self.sample(), **extra}) + "\n"
+        try:
+            os.write(self.fd, line.encode())
+        except OSError:
+            self.stopped.set()   # reader went away; stop reporting
+
+    def close(self):
+        """Stop the thread and write the final sample."""
+        self.stopped.set()
+        self.thread.join()
+        self.emit(done=True)
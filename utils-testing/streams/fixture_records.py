@@ -0,0 +1,90 @@
+"""
+The logical records behind every fixture made by generate_big_file.py
+
+Record i (ids start at 1) is:
+    id         i
+    username   "user_<i>"
+    email      "user_<i>@example.com"
+    isActive   i is even
+    createdAt  start_time + i seconds, ISO-8601 with a trailing "Z"
+
+json_record() is the reference encoding. The fast encoders in
+fixture_formats.py build the same values from templates and the cached
+timestamp parts below.
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+
+start_time = datetime(2025, 1, 1)
+
+FIELDS = [
+    {"name": "id", "type": "integer"},
+    {"name": "username", "type": "string"},
+    {"name": "email", "type": "string"},
+    {"name": "isActive", "type": "boolean"},
+    {"name": "createdAt", "type": "timestamp"},
+]
+
+IS_ACTIVE = ("true", "false")   # indexed by id & 1 (even ids are active)
+
+SECONDS_PER_DAY = 86400
+TIME_OF_DAY = [f"{h:02d}:{m:02d}:{s:02d}"
+               for h in range(24) for m in range(60) for s in range(60)]
+START_DAY = datetime(start_time.year, start_time.month, start_time.day)
+START_SECOND = (start_time - START_DAY).seconds
+START_EPOCH = int(start_time.replace(tzinfo=timezone.utc).timestamp())
+_day_prefixes = {}
+
+
+def day_prefix(day):
+    """'YYYY-MM-DDT' for the given day number after the start day (cached)."""
+    prefix = _day_prefixes.get(day)
+    if prefix is None:
+        prefix = (START_DAY + timedelta(days=day)).strftime("%Y-%m-%dT")
+        _day_prefixes[day] = prefix
+    return prefix
+
+
+def timestamp_runs(first_id, stop_id):
+    """Split ids first_id..stop_id-1 into runs that fall on the same day.
+
+    Yields (run_start, run_end, day_prefix, times) where times is the
+    HH:MM:SS string of each id in the run. The date part of createdAt only
+    changes once per 86400 records, so encoders format it once per run.
+    """
+    i = first_id
+    while i < stop_id:
+        day, second = divmod(START_SECOND + i, SECONDS_PER_DAY)
+        run_end = min(stop_id, i + SECONDS_PER_DAY - second)
+        yield i, run_end, day_prefix(day), \
+            TIME_OF_DAY[second:second + run_end - i]
+        i = run_end
+
+
+def digits_total(first_id, stop_id):
+    """Total number of decimal digits in ids first_id..stop_id-1."""
+    total = 0
+    digits, low = len(str(first_id)), first_id
+    while low < stop_id:
+        high = min(stop_id, 10 ** digits)
+        total += digits * (high - low)
+        digits, low = digits + 1, high
+    return total
+
+
+def odd_count(first_id, stop_id):
+    """Number of odd ids (isActive false) in first_id..stop_id-1."""
+    return stop_id // 2 - first_id // 2
+
+
+def json_record(i):
+    """Reference encoding of record i - what the fast path must match."""
+    record = {
+        "id": i,
+        "username": f"user_{i}",
+        "email": f"user_{i}@example.com",
+        "isActive": i % 2 == 0,
+        "createdAt": (start_time + timedelta(seconds=i)).isoformat() + "Z"
+    }
+    return json.dumps(record) + "\n"
@@ -0,0 +1,292 @@
+"""
+Schema-driven records for generate_big_file.py (--schema schema.json)
+
+A schema lists the fields of each record and a seed:
+
+    {
+      "seed": 42,
+      "fields": [
+        {"name": "id", "type": "id"},
+        {"name": "username", "type": "string", "format": "user_{id}"},
+        {"name": "score", "type": "integer", "min": 0, "max": 100},
+        {"name": "plan", "type": "choice", "values": ["free", "pro"],
+         "weights": [9, 1]},
+        {"name": "isActive", "type": "boolean", "distribution": "even"},
+        {"name": "createdAt", "type": "timestamp",
+         "start": "2025-01-01T00:00:00", "step": 1}
+      ]
+    }
+
+Field types:
+    id         the record id (1, 2, 3, ...)
+    string     "format" with {id} placeholders
+    integer    "min"/"max", distribution "uniform" (default) or "zipf"
+               (with exponent "s", default 1.1)
+    float      distribution "uniform" ("min"/"max") or "normal"
+               ("mean"/"stddev"), printed with "precision" decimals
+    boolean    distribution "even" / "odd" (by id) or "bernoulli" ("p")
+    choice     "values", optional "weights"
+    timestamp  "start" + id * "step" seconds, ISO-8601 with "Z"
+
+compile_schema() turns a schema into one encoder function: the line
+template is built once and the per-record code is generated Python, so
+nothing interprets the field list per record. Random values come from one
+random.Random per field per RANDOM_CHUNK ids, seeded from the schema seed,
+so the output depends only on the seed and the id range - not on block
+sizes or --workers.
+"""
+
+import json
+import random
+import re
+from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import accumulate
+
+from fixture_records import SECONDS_PER_DAY, TIME_OF_DAY
+
+RANDOM_CHUNK = 1024
+FORMATS = ("ndjson", "csv")
+BOOLEANS = ("true", "false")   # indexed by id & 1 for "even"
+CONVERSION = re.compile(r"%%|%[.\d]*[sdf]")
+DAY = "day"
+
+
+class SchemaError(ValueError):
+    pass
+
+
+def load_schema(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def schema_text(schema):
+    """Canonical JSON text of a schema (what worker processes receive)."""
+    return json.dumps(schema, sort_keys=True, separators=(",", ":"))
+
+
+class TimestampColumn:
+    """createdAt-style strings for start + id * step seconds.
+
+    With step 1 the column is built per day, like the built-in encoder:
+    spans never cross midnight (see `period`), so a call returns the day
+    prefix once plus a slice of TIME_OF_DAY.
+    """
+
+    def __init__(self, start, step):
+        start = datetime.fromisoformat(start.rstrip("Z"))
+        self.day = datetime(start.year, start.month, start.day)
+        self.offset = (start - self.day).seconds
+        self.step = step
+        self.prefixes = {}
+        # ids where a new day starts, as (period, phase) for make_spans
+        self.period = (SECONDS_PER_DAY, -self.offset % SECONDS_PER_DAY) \
+            if step == 1 else None
+
+    def prefix(self, day):
+        prefix = self.prefixes.get(day)
+        if prefix is None:
+            prefix = (self.day + timedelta(days=day)).strftime("%Y-%m-%dT")
+            self.prefixes[day] = prefix
+        return prefix
+
+    def __call__(self, first_id, stop_id):
+        if self.step == 1:
+            day, second = divmod(self.offset + first_id, SECONDS_PER_DAY)
+            return self.prefix(day), \
+                TIME_OF_DAY[second:second + stop_id - first_id]
+        prefix, offset, step = self.prefix, self.offset, self.step
+        return [prefix(d) + TIME_OF_DAY[s] for d, s in (
+            divmod(offset + i * step, SECONDS_PER_DAY)
+            for i in range(first_id, stop_id))]
+
+
+def random_column(draw, seed, field_number):
+    """Column builder for a random field.
+
+    draw(rng, n) returns n encoded values. Ids are grouped in chunks of
+    RANDOM_CHUNK with their own generator, so a block that starts inside a
+    chunk draws and drops the values before it.
+    """
+    def column(first_id, stop_id):
+        chunk, skip = divmod(first_id - 1, RANDOM_CHUNK)
+        rng = random.Random(f"{seed}:{field_number}:{chunk}")
+        values = draw(rng, skip + stop_id - first_id)
+        return values[skip:] if skip else values
+    return column
+
+
+def quote(value, fmt):
+    """Encode a literal string for the output format."""
+    if fmt == "ndjson":
+        return json.dumps(value)
+    if any(c in value for c in ',"\n\r'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def string_template(fmt_string, fmt):
+    """'user_{id}' -> ('"user_%d"', ['i']) for the line template."""
+    literal = fmt_string.replace("{id}", "\0")
+    if "{" in literal or "}" in literal:
+        raise SchemaError(f"only {{id}} is supported in formats: "
+                          f"{fmt_string!r}")
+    quoted = quote(literal, fmt).replace("%", "%%")
+    placeholder = quote("\0", fmt)[1:-1] if fmt == "ndjson" else "\0"
+    return quoted.replace(placeholder, "%d"), \
+        ["i"] * literal.count("\0")
+
+
+def compile_field(field, number, seed, fmt):
+    """Return (template piece, argument expressions, column builder).
+
+    In the arguments None stands for the field's column value and DAY for
+    the per-span day prefix of a step-1 timestamp column.
+    """
+    kind = field.get("type")
+    dist = field.get("distribution")
+
+    if kind == "id":
+        return "%d", ["i"], None
+    if kind == "string":
+        piece, args = string_template(field["format"], fmt)
+        return piece, args, None
+    if kind == "timestamp":
+        column = TimestampColumn(field.get("start", "2025-01-01T00:00:00"),
+                                 field.get("step", 1))
+        if column.step == 1:
+            return quote("%s%sZ", fmt), [DAY, None], column
+        return quote("%sZ", fmt), [None], column
+    if kind == "boolean":
+        if dist in ("even", "odd"):
+            values = BOOLEANS if dist == "even" else BOOLEANS[::-1]
+            return "%s", [f"{values!r}[i & 1]"], None
+        p = field.get("p", 0.5)
+        true, false = BOOLEANS
+        return "%s", [None], random_column(
+            lambda rng, n: [true if rng.random() < p else false
+                            for _ in range(n)], seed, number)
+    if kind == "integer":
+        low, high = field.get("min", 0), field.get("max", 100)
+        population = range(low, high + 1)
+        if dist == "zipf":
+            s = field.get("s", 1.1)
+            weights = list(accumulate(1 / k ** s
+                                      for k in range(1, len(population) + 1)))
+            draw = lambda rng, n: rng.choices(population, cum_weights=weights,
+                                              k=n)
+        elif dist in (None, "uniform"):
+            draw = lambda rng, n: rng.choices(population, k=n)
+        else:
+            raise SchemaError(f"unknown integer distribution {dist!r}")
+        return "%d", [None], random_column(draw, seed, number)
+    if kind == "float":
+        precision = field.get("precision", 2)
+        if dist == "normal":
+            mean, stddev = field.get("mean", 0.0), field.get("stddev", 1.0)
+            draw = lambda rng, n: [rng.gauss(mean, stddev) for _ in range(n)]
+        elif dist in (None, "uniform"):
+            low, high = field.get("min", 0.0), field.get("max", 1.0)
+            draw = lambda rng, n: [rng.uniform(low, high) for _ in range(n)]
+        else:
+            raise SchemaError(f"unknown float distribution {dist!r}")
+        return f"%.{precision}f", [None], random_column(draw, seed, number)
+    if kind == "choice":
+        values = [quote(v, fmt) if isinstance(v, str) else json.dumps(v)
+                  for v in field["values"]]
+        weights = field.get("weights")
+        cum_weights = list(accumulate(weights)) if weights else None
+        return "%s", [None], random_column(
+            lambda rng, n: rng.choices(values, cum_weights=cum_weights, k=n),
+            seed, number)
+    raise SchemaError(f"field {field.get('name')!r}: unknown type {kind!r}")
+
+
+def compile_schema(schema, fmt="ndjson"):
+    """Build encode(first_id, stop_id) -> bytes for a schema.
+
+    Returns (encode, header). header is the csv header line, b"" for ndjson.
+    """
+    if fmt not in FORMATS:
+        raise SchemaError(f"schemas support {', '.join(FORMATS)}, not {fmt}")
+    seed = schema.get("seed", 0)
+    fields = schema["fields"]
+
+    pieces, args, setup, namespace = [], [], [], {}
+    names, periods = [], []
+    for number, field in enumerate(fields):
+        piece, field_args, column = compile_field(field, number, seed, fmt)
+        if column is not None:
+            name = f"v{number}"
+            names.append(name)
+            namespace[f"col_{name}"] = column
+            period = getattr(column, "period", None)
+            if period:
+                setup.append(f"d{number}, {name} = col_{name}(a, b)")
+                periods.append(period)
+            else:
+                setup.append(f"{name} = col_{name}(a, b)")
+                periods.append((RANDOM_CHUNK, 1))
+            field_args = [name if a is None else
+                          f"d{number}" if a == DAY else a
+                          for a in field_args]
+        key = json.dumps(field["name"]) + ": " if fmt == "ndjson" else ""
+        pieces.append(key.replace("%", "%%") + piece)
+        args += field_args
+
+    if fmt == "ndjson":
+        template = "{" + ", ".join(pieces) + "}\n"
+        header = b""
+    else:
+        template = ",".join(pieces) + "\n"
+        header = (",".join(quote(f["name"], fmt) for f in fields)
+                  + "\n").encode()
+
+    loop_vars = ", ".join(["i"] + names)
+    loop_iter = f"zip(range(a, b), {', '.join(names)})" if names \
+        else "range(a, b)"
+    lines = ["def encode(first_id, stop_id):",
+             "    out = []",
+             "    for a, b in spans(first_id, stop_id):"]
+    lines += [f"        {line}" for line in setup]
+    lines += [f"        out.append(''.join([T % ({', '.join(args)},)",
+              f"                            for {loop_vars} in {loop_iter}]))",
+              "    return ''.join(out).encode()"]
+
+    namespace.update(T=template, spans=make_spans(sorted(set(periods))))
+    exec("\n".join(lines), namespace)
+    encode = namespace["encode"]
+    encode.source = "\n".join(lines)
+    encode.template = template
+    return encode, header
+
+
+def make_spans(periods):
+    """spans(first_id, stop_id) that cuts at every id i where
+    (i - phase) % period == 0 for one of the (period, phase) pairs:
+    RANDOM_CHUNK boundaries for random columns, midnight for timestamps."""
+    if not periods:
+        return lambda first_id, stop_id: ((first_id, stop_id),)
+
+    def spans(first_id, stop_id):
+        a = first_id
+        while a < stop_id:
+            b = min([stop_id] + [a + (period - (a - phase) % period)
+                                 for period, phase in periods])
+            yield a, b
+            a = b
+    return spans
+
+
+def min_record_length(encode):
+    """Lower bound for one encoded record: the template with every value
+    one byte long."""
+    return len(CONVERSION.sub(lambda m: "%" if m.group() == "%%" else "x",
+                              encode.template))
+
+
+@lru_cache(maxsize=None)
+def compiled(text, fmt):
+    """compile_schema() for schema_text(), cached per process."""
+    return compile_schema(json.loads(text), fmt)
@@ -0,0 +1,176 @@
+"""
+Record-size distributions and chunk-boundary straddling for
+generate_big_file.py (--record-sizes, --straddle)
+
+The built-in records are all about 130 bytes, so a stream reader's
+leftover handling always sees the same short tails. --record-sizes appends
+a "padding" string to every ndjson record, its length drawn from
+
+    fixed:N                 always N bytes
+    uniform:MIN:MAX         uniform in MIN..MAX
+    zipf:MIN:MAX[:S]        long tail: P(MIN + k) ~ 1 / (k + 1) ** S (S 1.1)
+    spikes:BASE:SPIKE[:P]   BASE bytes, SPIKE bytes with probability P
+                            (default 0.001), e.g. spikes:32:16K
+
+Lengths are drawn per RANDOM_CHUNK ids like schema fields, so they do not
+depend on block sizes or --workers.
+
+--straddle SIZE rewrites the padding so that a multibyte UTF-8 character
+(2, 3 or 4 bytes, split at every possible byte) crosses every multiple of
+SIZE in the file - every chunk boundary of a reader with that
+highWaterMark. A boundary that falls outside a padding string is moved
+into one by growing the padding of the record it falls in, or of the one
+before it. Chunks must be at least MIN_STRADDLE bytes: a smaller chunk can
+fit between the start of a record and its padding.
+"""
+
+import json
+from functools import lru_cache
+from itertools import accumulate
+
+from fixture_formats import encode_ndjson
+from fixture_schema import random_column
+
+DISTRIBUTIONS = ("fixed", "uniform", "zipf", "spikes")
+PADDING_KEY = b', "padding": "'
+FILLER = b"x"
+# characters that straddle boundaries, cycled through with every split
+STRADDLE_CHARS = tuple(c.encode() for c in ("\u00e9", "\u20ac",
+                                            "\U0001f600"))
+MIN_STRADDLE = 256   # more than the part of a record before its padding
+
+
+def padding_column(sizes):
+    """column(first_id, stop_id) -> padding lengths for a sizes dict."""
+    dist, low, high = sizes["distribution"], sizes["min"], sizes["max"]
+    if dist == "fixed":
+        return lambda first_id, stop_id: [low] * (stop_id - first_id)
+    population = range(low, high + 1)
+    if dist == "uniform":
+        draw = lambda rng, n: rng.choices(population, k=n)
+    elif dist == "zipf":
+        s = sizes.get("s", 1.1)
+        weights = list(accumulate(1 / k ** s
+                                  for k in range(1, len(population) + 1)))
+        draw = lambda rng, n: rng.choices(population, cum_weights=weights,
+                                          k=n)
+    elif dist == "spikes":
+        rate = sizes.get("rate", 0.001)
+        draw = lambda rng, n: rng.choices((low, high),
+                                          cum_weights=(1 - rate, 1), k=n)
+    else:
+        raise ValueError(f"unknown record size distribution {dist!r}")
+    return random_column(draw, "padding", 0)
+
+
+@lru_cache(maxsize=None)
+def padded_encoder(text):
+    """encode(first_id, stop_id) for the built-in ndjson records with
+    padding; text is the sizes dict as canonical JSON (picklable)."""
+    sizes = json.loads(text)
+    lengths = padding_column(sizes)
+    fill = FILLER * sizes["max"]
+
+    def encode(first_id, stop_id):
+        lines = encode_ndjson(first_id, stop_id).split(b"\n")
+        lines.pop()
+        return b"".join([b'%s%s%s"}\n' % (line[:-1], PADDING_KEY, fill[:n])
+                         for line, n in zip(lines,
+                                            lengths(first_id, stop_id))])
+    # the shortest record: id 1 with the least padding
+    encode.min_length = len(encode_ndjson(1, 2)) + len(PADDING_KEY) + 1 \
+        + sizes["min"]
+    return encode
+
+
+class Straddler:
+    """Rewrites a stream of padded ndjson blocks so a multibyte character
+    crosses every multiple of chunk_size.
+
+    feed() returns the rewritten lines except the last one, which is held
+    back because a boundary early in the next block may have to grow it.
+    finish() returns that line.
+    """
+
+    def __init__(self, chunk_size, start=0):
+        if chunk_size < MIN_STRADDLE:
+            raise ValueError(f"--straddle needs chunks of at least "
+                             f"{MIN_STRADDLE} bytes")
+        self.chunk_size = chunk_size
+        self.offset = start    # file offset of the held back line
+        self.next = (start // chunk_size + 1) * chunk_size
+        self.pending = None
+        self.moved = None      # file offset of the last line moved forward
+        self.straddled = 0
+        self.missed = 0
+
+    def _char(self):
+        n = self.straddled
+        char = STRADDLE_CHARS[n % len(STRADDLE_CHARS)]
+        split = 1 + n // len(STRADDLE_CHARS) % (len(char) - 1)
+        return char, split   # split = bytes before the boundary
+
+    def feed(self, block):
+        lines = block.split(b"\n")
+        lines.pop()
+        if self.pending is not None:
+            lines.insert(0, self.pending)
+        out = []
+        pos = self.offset
+        for line in lines:
+            end = pos + len(line) + 1
+            while self.next < end:
+                line, pos = self._place(line, pos, out)
+                end = pos + len(line) + 1
+                self.next += self.chunk_size
+            out.append(line)
+            pos = end
+        if not out:
+            return b""
+        self.pending = out.pop()
+        data = b"\n".join(out) + b"\n" if out else b""
+        self.offset += len(data)
+        return data
+
+    def finish(self):
+        if self.pending is None:
+            return b""
+        data, self.pending = self.pending + b"\n", None
+        self.offset += len(data)
+        return data
+
+    def _place(self, line, pos, out):
+        """Put a character across self.next, which lies in line (at file
+        offset pos) or just after it. Returns the line and its new pos."""
+        char, split = self._char()
+        first = self.next - split          # file offset of the character
+        pad = line.rfind(PADDING_KEY)
+        if pad < 0:
+            self.missed += 1
+            return line, pos
+        pad_start = pos + pad + len(PADDING_KEY)
+        if first < pad_start:
+            # in front of the padding: grow the previous line instead,
+            # which moves this one past the boundary
+            if not out or pos == self.moved:
+                self.missed += 1
+                return line, pos
+            prev = out[-1]
+            prev_pos = pos - len(prev) - 1
+            pad_end = pos - 3                # before '"}\n'
+            grow = max(0, first + len(char) - pad_end)
+            cut = pad_end - prev_pos
+            prev = prev[:cut] + FILLER * grow + prev[cut:]
+            at = first - prev_pos
+            out[-1] = prev[:at] + char + prev[at + len(char):]
+            self.straddled += 1
+            self.moved = pos + grow
+            return line, pos + grow
+        pad_end = pos + len(line) - 2        # before '"}'
+        grow = max(0, first + len(char) - pad_end)
+        if grow:
+            cut = pad_end - pos
+            line = line[:cut] + FILLER * grow + line[cut:]
+        at = first - pos
+        self.straddled += 1
+        return line[:at] + char + line[at + len(char):], pos
@@ -0,0 +1,95 @@
+"""
+Background writer for generate_big_file.py
+
+The generator thread hands each encoded block, as it is, to a writer
+thread that writes it to the file; nothing is copied on the way. File
+writes release the GIL, so encoding the next block and writing the
+previous one overlap, and wall time tends towards max(encode, write)
+instead of their sum. At most PENDING blocks wait to be written, so memory
+stays flat however many records are generated: when the queue is full,
+write() blocks.
+
+The writer thread adds the time it spends in f.write to
+stats["write_seconds"], and write() the time it waits for room in the
+queue to stats["wait_seconds"].
+"""
+
+import os
+import queue
+import threading
+import time
+
+PENDING = 4   # blocks waiting for the writer thread
+
+
+class BackgroundWriter:
+    """File-like wrapper: write() queues the block, a thread writes it."""
+
+    def __init__(self, f, stats=None, pending=PENDING):
+        self.f = f
+        self.stats = stats if stats is not None else {}
+        self.stats.setdefault("write_seconds", 0.0)
+        self.stats.setdefault("wait_seconds", 0.0)
+        self.blocks = queue.Queue(pending)
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True,
+                                       name="fixture-writer")
+        self.thread.start()
+
+    def _run(self):
+        write, stats = self.f.write, self.stats
+        while True:
+            block = self.blocks.get()
+            if block is None:
+                return
+            if self.error is None:
+                started = time.perf_counter()
+                try:
+                    write(block)
+                except BaseException as e:   # re-raised by write()/close()
+                    self.error = e
+                stats["write_seconds"] += time.perf_counter() - started
+
+    def _check(self):
+        if self.error is not None:
+            raise self.error
+
+    def write(self, data):
+        self._check()
+        if not isinstance(data, bytes):
+            data = bytes(data)   # the caller may reuse a mutable buffer
+        started = time.perf_counter()
+        self.blocks.put(data)
+        self.stats["wait_seconds"] += time.perf_counter() - started
+        return len(data)
+
+    def flush(self):
+        pass   # blocks are queued whole; close() waits for them
+
+    def close(self):
+        """Wait for the writer thread to write every queued block."""
+        self.blocks.put(None)
+        self.thread.join()
+        self._check()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def preallocate(f, size):
+    """Reserve size bytes from the current position of f (fallocate).
+
+    The file position does not move, so the following writes fill the
+    reserved space. Returns whether space was reserved; if it was, the
+    caller truncates the file to f.tell() once it is done writing.
+    """
+    if not hasattr(os, "posix_fallocate") or size <= 0:
+        return False
+    try:
+        os.posix_fallocate(f.fileno(), f.tell(), size)
+    except OSError:
+        return False   # e.g. a filesystem without fallocate support
+    return True
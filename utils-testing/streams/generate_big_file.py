@@ -1,23 +1,712 @@
+import argparse
+import gzip
 import json
-from datetime import datetime, timedelta
+import lzma
+import os
+import stat
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from fixture_cache import FixtureCache, cache_key, detach
+from fixture_checkpoint import (ResumeError, clear_checkpoint,
+                                find_resume_point, read_checkpoint,
+                                write_checkpoint)
+from fixture_formats import (FORMATS, encode_ndjson_reference,
+                             records_for_bytes, records_size, write_manifest)
+from fixture_golden import GoldenWriter
+from fixture_metrics import MetricsReporter
+from fixture_index import IndexWriter, index_path
+from fixture_schema import (compiled, load_schema, min_record_length,
+                            schema_text)
+from fixture_sizes import (DISTRIBUTIONS, MIN_STRADDLE, Straddler,
+                           padded_encoder)
+from fixture_writer import BackgroundWriter, preallocate
 
 OUTPUT_FILE = "huge_data.json"
 TOTAL_RECORDS = 1_000_000   # change this number for more/less data
+BLOCK_RECORDS = 8192        # records encoded per bulk write
+SHARD_BLOCKS = 16           # blocks per worker task with --workers
 
 # command to run the file python generate_big_file.py
+# use --encoder json to run the original (slow) per-record json.dumps loop
+# use --workers N to encode on N processes (same bytes as a single process)
+# use --index-every N to also write huge_data.json.idx (see fixture_index.py)
+# use --records N or --target-bytes 5G instead of editing TOTAL_RECORDS
+# use -o - to stream to stdout, e.g. python generate_big_file.py -o - | gzip
+# use -o huge_data.json.gz (or .xz) to compress, in parallel with --workers
+# use --format csv|frames|columnar for the same records in another layout
+# use --schema schemas/orders.json for other records (see fixture_schema.py)
+# use --resume to finish an interrupted run, --append N to add N records
+# use --background-writer (and --preallocate) to overlap encoding and writes
+# use --cache DIR to reuse fixtures generated with the same parameters
+# use --golden for the expected filter output and hashes (fixture_golden.py)
+# use --record-sizes zipf:0:64K and --straddle 16K to stress stream readers
+# use --metrics 1 for a JSON line of progress every second on stderr
+
+STDOUT_BUFFER = 1 << 20
+CACHE_BUDGET = "10G"
+
+# encoders by name (worker processes look them up here); "json" is the
+# original json.dumps loop
+ENCODERS = {name: spec["encode"] for name, spec in FORMATS.items()}
+ENCODERS["json"] = encode_ndjson_reference
+
+
+def resolve_encoder(encoder):
+    """ENCODERS name, ("schema", schema_text, fmt) for a compiled schema or
+    ("padded", sizes_text) for records with padding (fixture_sizes.py).
+
+    Schemas and size distributions travel to worker processes as text and
+    are compiled once per process, since the encoder functions cannot be
+    pickled.
+    """
+    if isinstance(encoder, str):
+        return ENCODERS[encoder]
+    if encoder[0] == "padded":
+        return padded_encoder(encoder[1])
+    _, text, fmt = encoder
+    return compiled(text, fmt)[0]
+
+
+def sizes_text(sizes):
+    return json.dumps(sizes, sort_keys=True, separators=(",", ":"))
+
+
+def parse_size(text):
+    """'5G' -> 5 * 1024**3. Accepts K/M/G/T with an optional B/iB suffix."""
+    units = {"": 1, "K": 1 << 10, "M": 1 << 20, "G": 1 << 30, "T": 1 << 40}
+    value = text.strip().upper()
+    for suffix in ("IB", "B"):
+        if value.endswith(suffix) and value[:-len(suffix)][-1:] in "KMGT":
+            value = value[:-len(suffix)]
+            break
+    unit = value[-1:] if value[-1:] in "KMGT" else ""
+    try:
+        return int(float(value[:len(value) - len(unit)]) * units[unit])
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid size: {text!r}")
+
+
+def parse_record_sizes(text):
+    """'zipf:0:64K' -> {"distribution": "zipf", "min": 0, "max": 65536}.
+
+    See fixture_sizes.py for the distributions and their arguments.
+    """
+    dist, *args = text.split(":")
+    counts = {"fixed": (1, 1), "uniform": (2, 2), "zipf": (2, 3),
+              "spikes": (2, 3)}
+    if dist not in DISTRIBUTIONS or \
+            not counts[dist][0] <= len(args) <= counts[dist][1]:
+        raise argparse.ArgumentTypeError(
+            f"invalid record sizes {text!r}: use fixed:N, uniform:MIN:MAX, "
+            f"zipf:MIN:MAX[:S] or spikes:BASE:SPIKE[:P]")
+    low = parse_size(args[0])
+    high = parse_size(args[1]) if len(args) > 1 else low
+    if not 0 <= low <= high:
+        raise argparse.ArgumentTypeError(f"invalid record sizes {text!r}: "
+                                         f"need 0 <= MIN <= MAX")
+    sizes = {"distribution": dist, "min": low, "max": high}
+    if len(args) == 3:
+        sizes["s" if dist == "zipf" else "rate"] = float(args[2])
+    return sizes
+
+
+COMPRESSORS = {
+    "gzip": lambda data, level: gzip.compress(data, level, mtime=0),
+    "xz": lambda data, level: lzma.compress(data, preset=level),
+}
+DEFAULT_LEVELS = {"gzip": 6, "xz": 6}
+COMPRESSION_SUFFIXES = {".gz": "gzip", ".xz": "xz"}
+
+
+def encode_shard(encoder, first_id, stop_id, block_records,
+                 compression=None, level=None):
+    """Encode one shard as a list of (data, records, raw_size) chunks.
+
+    Uncompressed shards come back as one chunk per block. Compressed shards
+    come back as a single chunk: one complete gzip member / xz stream.
+    Concatenated members are still a valid .gz/.xz file (zlib.createGunzip
+    reads them back to back), so shards compress independently.
+    """
+    encode = resolve_encoder(encoder)
+    chunks = []
+    for a in range(first_id, stop_id, block_records):
+        b = min(a + block_records, stop_id)
+        block = encode(a, b)
+        chunks.append((block, b - a, len(block)))
+    if compression is None:
+        return chunks
+    raw = b"".join([block for block, _, _ in chunks])
+    return [(COMPRESSORS[compression](raw, level), stop_id - first_id,
+             len(raw))]
+
+
+def iter_chunks(total_records, encoder="ndjson",
+                block_records=BLOCK_RECORDS, workers=1,
+                compression=None, level=None, first_id=1):
+    """Yield (data, records, raw_size) for ids first_id..total_records.
+
+    Without compression a chunk is one encoded block; with compression it is
+    one compressed shard of SHARD_BLOCKS blocks. With workers > 1 shards are
+    encoded in a process pool. At most 2 * workers shards are in flight and
+    they are collected in submission order, so memory stays bounded and the
+    output is identical to the single-process run.
+    """
+    start, stop = first_id, total_records + 1
+    if workers <= 1 and compression is None:
+        encode = resolve_encoder(encoder)
+        for first_id in range(start, stop, block_records):
+            block = encode(first_id, min(first_id + block_records, stop))
+            yield block, min(block_records, stop - first_id), len(block)
+        return
+
+    shard_records = block_records * SHARD_BLOCKS
+    shards = iter(range(start, stop, shard_records))
+    if workers <= 1:
+        for first_id in shards:
+            yield from encode_shard(encoder, first_id,
+                                    min(first_id + shard_records, stop),
+                                    block_records, compression, level)
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+
+        def submit():
+            first_id = next(shards, None)
+            if first_id is not None:
+                pending.append(pool.submit(
+                    encode_shard, encoder, first_id,
+                    min(first_id + shard_records, stop), block_records,
+                    compression, level))
+
+        for _ in range(workers * 2):
+            submit()
+        while pending:
+            chunks = pending.pop(0).result()
+            submit()
+            yield from chunks
+
+
+def compression_for(output_file):
+    return COMPRESSION_SUFFIXES.get(os.path.splitext(output_file)[1])
+
+
+def default_output(fmt):
+    return os.path.splitext(OUTPUT_FILE)[0] + FORMATS[fmt]["suffix"]
+
+
+def manifest_path(output_file):
+    return output_file + ".manifest.json"
+
+
+def format_header(fmt, schema=None):
+    if schema is not None:
+        return compiled(schema_text(schema), fmt)[1]
+    return FORMATS[fmt].get("header", b"")
+
+
+def open_output(output_file, append=False):
+    """Binary file for output_file, or stdout (left open) for '-'."""
+    if output_file == "-":
+        return open(sys.stdout.fileno(), "wb", buffering=STDOUT_BUFFER,
+                    closefd=False)
+    if append:
+        detach(output_file)
+        f = open(output_file, "r+b")
+        f.seek(0, os.SEEK_END)
+        return f
+    if os.path.isfile(output_file) and os.stat(output_file).st_nlink > 1:
+        # a hard link into the fixture cache: don't truncate the original
+        os.remove(output_file)
+    return open(output_file, "wb")
+
+
+def straddle_chunks(chunks, straddler):
+    """Pass uncompressed chunks through a fixture_sizes.Straddler."""
+    for data, _, _ in chunks:
+        data = straddler.feed(data)
+        yield data, data.count(b"\n"), len(data)
+    data = straddler.finish()
+    if data:
+        yield data, 1, len(data)
+
+
+def write_chunks(out, stats, header, total_records, encoder, block_records,
+                 workers, compression, level, first_id, existing_bytes,
+                 max_bytes, index, golden=None, straddler=None):
+    """The write loop of generate(): header, then every chunk in order."""
+    if header:
+        data = COMPRESSORS[compression](header, level) \
+            if compression else header
+        out.write(data)
+        stats["bytes"] += len(data)
+        if golden:
+            golden.add_header(data)
+    chunks = iter_chunks(total_records, encoder, block_records, workers,
+                         compression, level, first_id)
+    if straddler:
+        chunks = straddle_chunks(chunks, straddler)
+    for data, records, raw_size in chunks:
+        used = existing_bytes + stats["raw_bytes"]
+        full = max_bytes is not None and used + raw_size > max_bytes
+        if full:
+            data = data[:data.rfind(b"\n", 0, max_bytes - used) + 1]
+            records, raw_size = data.count(b"\n"), len(data)
+        if isinstance(out, BackgroundWriter):
+            out.write(data)   # its thread times the file writes
+        else:
+            started = time.perf_counter()
+            out.write(data)
+            stats["write_seconds"] += time.perf_counter() - started
+        stats["bytes"] += len(data)
+        stats["raw_bytes"] += raw_size
+        stats["records"] += records
+        if index:
+            index.add_block(data, records)
+        if golden:
+            golden.add_block(data, records)
+        if full:
+            break
+
+
+def generate(output_file=OUTPUT_FILE, total_records=TOTAL_RECORDS,
+             fmt="ndjson", block_records=BLOCK_RECORDS, workers=1,
+             index_every=0, compression=None, level=None, encoder=None,
+             manifest=None, schema=None, max_bytes=None, first_id=1,
+             existing_bytes=0, background=False, preallocate_file=False,
+             golden=False, record_sizes=None, straddle=None,
+             metrics_interval=None, metrics_fd=2, target_bytes=None):
+    """Write total_records records to output_file, one bulk write per chunk.
+
+    fmt is a key of FORMATS; encoder overrides its block encoder by ENCODERS
+    name (only "json" makes sense). schema replaces the built-in records
+    (ndjson or csv only). With index_every > 0 the offset of every
+    index_every-th record goes into the side index. compression is None,
+    "gzip" or "xz". max_bytes cuts the output after the last whole line
+    that fits (uncompressed line formats). The manifest is written for
+    schemas and every format but ndjson, to regular files, unless manifest
+    says otherwise.
+
+    first_id > 1 appends ids first_id..total_records to an output_file of
+    existing_bytes bytes (see fixture_checkpoint.find_resume_point).
+    While a regular file is written its parameters are kept in
+    <output>.ckpt, with the --target-bytes it was asked for (target_bytes)
+    and max_bytes, so that a resumed run stops at the same budget. Other
+    outputs (stdout, /dev/null, a FIFO) get no checkpoint.
+
+    background hands the writes to a fixture_writer.BackgroundWriter
+    thread. preallocate_file reserves the exact output size up front when
+    it is known (built-in records, uncompressed).
+
+    golden also writes the expected transform output and hashes of a new,
+    uncompressed ndjson/csv file (see fixture_golden.py).
+
+    record_sizes (a parse_record_sizes() dict) pads the built-in ndjson
+    records; straddle puts a multibyte character across every multiple of
+    that many bytes (uncompressed, padding fixed:0 unless record_sizes).
+
+    metrics_interval writes a JSON line of progress to metrics_fd every
+    that many seconds (see fixture_metrics.py).
+
+    Returns a stats dict with records, raw_bytes, bytes (as written in this
+    run), file_records, file_bytes (the whole file) and compression.
+    """
+    spec = FORMATS[fmt]
+    encoder = encoder or fmt
+    header = format_header(fmt, schema)
+    if schema is not None:
+        encoder = ("schema", schema_text(schema), fmt)
+    if straddle and record_sizes is None:
+        record_sizes = {"distribution": "fixed", "min": 0, "max": 0}
+    if record_sizes is not None:
+        if fmt != "ndjson" or schema is not None:
+            raise ValueError("record sizes apply to the built-in ndjson "
+                             "records")
+        encoder = ("padded", sizes_text(record_sizes))
+    appending = first_id > 1 or existing_bytes > 0
+    if appending:
+        header = b""
+    index = None
+    if index_every:
+        if output_file == "-" or compression or not spec.get("lines") \
+                or appending or straddle:
+            raise ValueError("--index-every needs a new, uncompressed, "
+                             "line-based output file (and no --straddle)")
+        index = IndexWriter(index_path(output_file), index_every,
+                            len(header))
+    if golden:
+        if output_file == "-" or compression or not spec.get("lines") \
+                or appending:
+            raise ValueError("--golden needs a new, uncompressed, "
+                             "line-based output file")
+        golden = GoldenWriter(output_file, fmt)
+    straddler = None
+    if straddle:
+        if compression:
+            raise ValueError("--straddle needs uncompressed output")
+        straddler = Straddler(straddle, existing_bytes)
+    if compression and level is None:
+        level = DEFAULT_LEVELS[compression]
+
+    stats = {"records": 0, "raw_bytes": len(header),
+             "bytes": 0, "compression": compression, "write_seconds": 0.0}
+    metrics = MetricsReporter(stats, metrics_interval, metrics_fd).start() \
+        if metrics_interval else None
+    with open_output(output_file, appending) as f:
+        # only a regular file gets side files; not /dev/null, a FIFO, ...
+        regular = output_file != "-" \
+            and stat.S_ISREG(os.fstat(f.fileno()).st_mode)
+        if manifest is None:
+            manifest = (fmt != "ndjson" or schema is not None) and regular
+        if regular:
+            write_checkpoint(output_file, {
+                "format": fmt, "schema": schema, "records": total_records,
+                "record_sizes": record_sizes, "straddle": straddle,
+                "encoder": encoder if isinstance(encoder, str) else None,
+                "target_bytes": target_bytes, "max_bytes": max_bytes})
+        preallocated = False
+        if preallocate_file and schema is None and record_sizes is None \
+                and compression is None and output_file != "-":
+            preallocated = preallocate(f, records_size(
+                fmt, total_records, block_records)
+                - records_size(fmt, first_id - 1, block_records)
+                + len(header))
+        out = BackgroundWriter(f, stats) if background else f
+        try:
+            write_chunks(out, stats, header, total_records, encoder,
+                         block_records, workers, compression, level,
+                         first_id, existing_bytes, max_bytes, index,
+                         golden or None, straddler)
+        finally:
+            if background:
+                out.close()
+            if metrics:
+                metrics.close()
+        if preallocated:
+            f.truncate(f.tell())
+    if index:
+        index.close()
+    if golden:
+        stats["golden"] = golden.close()
+    if straddler:
+        stats["straddled"] = straddler.straddled
+        stats["straddle_missed"] = straddler.missed
+    stats["file_records"] = first_id - 1 + stats["records"]
+    stats["file_bytes"] = existing_bytes + stats["raw_bytes"]
+    if regular:
+        clear_checkpoint(output_file)
+    if manifest:
+        write_manifest(manifest_path(output_file), fmt, stats, block_records,
+                       schema)
+    return stats
+
+
+def generate_cached(cache, output_file, total_records=TOTAL_RECORDS,
+                    fmt="ndjson", compression=None, level=None, schema=None,
+                    max_bytes=None, manifest=None, **kwargs):
+    """generate() through a FixtureCache.
+
+    On a hit the cached fixture is cloned to output_file; on a miss it is
+    generated into the cache first. stats["cache"] says which happened.
+    Only for new files (no appending, no side index).
+    """
+    if compression and level is None:
+        level = DEFAULT_LEVELS[compression]
+    params = {"format": fmt, "records": total_records, "schema": schema,
+              "compression": compression, "level": level,
+              "max_bytes": max_bytes,
+              "block_records": kwargs.get("block_records", BLOCK_RECORDS),
+              "record_sizes": kwargs.get("record_sizes"),
+              "straddle": kwargs.get("straddle")}
+    key = cache_key(params)
+    found = cache.lookup(key, output_file)
+    if found:
+        stats, method = found
+        stats["cache"] = f"hit ({method})"
+    else:
+        stats = cache.store(key, params, lambda path: generate(
+            path, total_records, fmt, compression=compression, level=level,
+            schema=schema, max_bytes=max_bytes, manifest=False, **kwargs))
+        stats = dict(stats, cache="miss")
+        found = cache.lookup(key, output_file)
+        if not found:
+            raise RuntimeError(f"fixture {key} was evicted at once; is "
+                               f"the cache budget smaller than the fixture?")
+    if manifest is None:
+        manifest = fmt != "ndjson" or schema is not None
+    if manifest:
+        write_manifest(manifest_path(output_file), fmt, stats,
+                       params["block_records"], schema)
+    return stats
+
+
+def report(stats, elapsed, output_file):
+    # keep stdout clean when it carries the data
+    out = sys.stderr if output_file == "-" else sys.stdout
+    elapsed = max(elapsed, 1e-9)
+    name = "stdout" if output_file == "-" else output_file
+    records, raw = stats["records"], stats["raw_bytes"]
+    written = stats["bytes"]
+    if stats.get("cache", "").startswith("hit"):
+        print(f"Fixture cache {stats['cache']}: {records} records, "
+              f"{raw:,} bytes in {name} in {elapsed * 1e3:.1f} ms", file=out)
+        return
+    if stats.get("cache"):
+        print(f"Fixture cache {stats['cache']}", file=out)
+    print(f"Generated {records} records in {name}", file=out)
+    print(f"{raw:,} bytes, {elapsed:.2f}s, "
+          f"{records / elapsed:,.0f} records/s, "
+          f"{raw / elapsed / 1e6:,.1f} MB/s", file=out)
+    if "straddled" in stats:
+        print(f"{stats['straddled']:,} multibyte characters across chunk "
+              f"boundaries, {stats['straddle_missed']} boundaries missed",
+              file=out)
+    if stats.get("golden"):
+        golden = stats["golden"]
+        active = golden.get("active")
+        print(f"sha256 {golden['sha256']}", file=out)
+        if active:
+            print(f"expected filter output: {active['records']} active "
+                  f"records, {active['bytes']:,} bytes in {active['file']}",
+                  file=out)
+    if stats["compression"]:
+        print(f"compressed to {written:,} bytes, "
+              f"ratio {raw / max(written, 1):.1f}x, "
+              f"{written / elapsed / 1e6:,.1f} MB/s written", file=out)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Generate a large NDJSON file for the streams examples.")
+    parser.add_argument("-o", "--output",
+                        help=f"output file, '-' for stdout "
+                             f"(default {OUTPUT_FILE}, or huge_data.csv, "
+                             f".frames, .cols for the other formats)")
+    parser.add_argument("--format", choices=list(FORMATS),
+                        help="record layout (default ndjson)")
+    parser.add_argument("--manifest", action="store_true",
+                        help="also write <output>.manifest.json for ndjson "
+                             "(always written for the other formats)")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--records", type=int,
+                      help=f"number of records (default {TOTAL_RECORDS})")
+    size.add_argument("--target-bytes", type=parse_size, metavar="SIZE",
+                      help="write as many whole records as fit in SIZE "
+                           "bytes, e.g. 500M or 5G")
+    size.add_argument("--append", type=int, metavar="N",
+                      help="add N records to the end of an existing "
+                           "ndjson/csv file")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue an interrupted run: cut a torn last "
+                             "line and generate from the next id, with the "
+                             "parameters saved in <output>.ckpt")
+    parser.add_argument("--schema", metavar="FILE",
+                        help="generate records described by a JSON schema "
+                             "file (ndjson or csv)")
+    parser.add_argument("--record-sizes", type=parse_record_sizes,
+                        metavar="DIST",
+                        help="pad ndjson records to varied sizes: fixed:N, "
+                             "uniform:MIN:MAX, zipf:MIN:MAX[:S] or "
+                             "spikes:BASE:SPIKE[:P] (see fixture_sizes.py)")
+    parser.add_argument("--straddle", type=parse_size, metavar="SIZE",
+                        help="put a multibyte UTF-8 character across every "
+                             "SIZE-byte chunk boundary, e.g. 16K (ndjson)")
+    parser.add_argument("--encoder", choices=["template", "json"],
+                        default="template",
+                        help="'template' (fast, default) or 'json' "
+                             "(original json.dumps loop, same bytes)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="encoder processes (0 = one per CPU)")
+    parser.add_argument("--compress", choices=sorted(COMPRESSORS),
+                        help="compress the output (default: from the -o "
+                             "suffix, .gz or .xz)")
+    parser.add_argument("--level", type=int,
+                        help="compression level (default 6)")
+    parser.add_argument("--background-writer", action="store_true",
+                        help="write from a separate thread, which is "
+                             "handed the encoded blocks")
+    parser.add_argument("--preallocate", action="store_true",
+                        help="reserve the exact file size up front with "
+                             "fallocate (built-in records, uncompressed)")
+    parser.add_argument("--index-every", type=int, default=0, metavar="N",
+                        help="write a side index with the byte offset of "
+                             "every Nth record")
+    parser.add_argument("--metrics", type=float, metavar="SECONDS",
+                        help="write a JSON line of progress (records, "
+                             "bytes, throughput, time in write, RSS) every "
+                             "SECONDS")
+    parser.add_argument("--metrics-fd", type=int, default=2, metavar="FD",
+                        help="file descriptor for --metrics (default 2, "
+                             "stderr)")
+    parser.add_argument("--golden", action="store_true",
+                        help="also write the expected active-users output "
+                             "and sha256/per-record hashes in the same pass "
+                             "(uncompressed ndjson/csv, never from --cache)")
+    parser.add_argument("--cache", metavar="DIR",
+                        default=os.environ.get("FIXTURE_CACHE"),
+                        help="reuse fixtures generated with the same "
+                             "parameters from this directory (default "
+                             "$FIXTURE_CACHE)")
+    parser.add_argument("--cache-budget", type=parse_size, metavar="SIZE",
+                        default=parse_size(CACHE_BUDGET),
+                        help=f"disk budget of the cache, least recently used "
+                             f"fixtures are removed beyond it (default "
+                             f"{CACHE_BUDGET})")
+    args = parser.parse_args(argv)
+    for option, value in (("--records", args.records),
+                          ("--append", args.append)):
+        if value is not None and value < 0:
+            parser.error(f"{option} cannot be negative")
+    workers = args.workers or os.cpu_count() or 1
+    checkpoint = None
+    if args.resume:
+        output = args.output or default_output(args.format or "ndjson")
+        if os.path.isfile(output):
+            checkpoint = read_checkpoint(output)
+    if checkpoint:
+        # an interrupted run: keep its parameters
+        args.format = checkpoint["format"]
+        saved = checkpoint.get("target_bytes")
+        if saved is not None:
+            # its record count is only an upper bound of the byte budget,
+            # which is computed again below from the same parameters
+            if args.records is not None \
+                    or args.target_bytes not in (None, saved):
+                parser.error(f"--resume: {output} was generated with "
+                             f"--target-bytes {saved}; resume it without "
+                             f"--records or --target-bytes")
+            args.target_bytes = saved
+        elif args.target_bytes is not None:
+            parser.error(f"--resume: {output} was not generated with "
+                         f"--target-bytes")
+        else:
+            if args.records is None:
+                args.records = checkpoint["records"]
+        if checkpoint["encoder"] == "json":
+            args.encoder = "json"
+        args.record_sizes = checkpoint.get("record_sizes")
+        args.straddle = checkpoint.get("straddle")
+    args.format = args.format or "ndjson"
+    output = args.output or default_output(args.format)
+    compression = args.compress or compression_for(output)
+    if (args.resume or args.append is not None) \
+            and (output == "-" or compression or os.path.exists(output)
+                 and not os.path.isfile(output)):
+        parser.error("--resume/--append need an uncompressed, regular "
+                     "output file")
+    if args.index_every and (args.resume or args.append is not None):
+        parser.error("--index-every cannot be combined with --resume/"
+                     "--append")
+    if args.encoder == "json" and (args.format != "ndjson" or args.schema):
+        parser.error("--encoder json only applies to the built-in ndjson "
+                     "records")
+    schema = load_schema(args.schema) if args.schema else None
+    if checkpoint and checkpoint["schema"] is not None:
+        schema = checkpoint["schema"]
+    if schema and args.format not in ("ndjson", "csv"):
+        parser.error("--schema supports --format ndjson or csv")
+    if schema and args.target_bytes is not None and compression:
+        parser.error("--schema with --target-bytes needs uncompressed "
+                     "output")
+    padded = args.record_sizes is not None or args.straddle
+    if padded and (args.format != "ndjson" or schema
+                   or args.encoder == "json"):
+        parser.error("--record-sizes/--straddle apply to the built-in "
+                     "ndjson records")
+    if padded and args.target_bytes is not None and compression:
+        parser.error("--record-sizes with --target-bytes needs "
+                     "uncompressed output")
+    if args.metrics is not None and args.metrics <= 0:
+        parser.error("--metrics needs a positive interval")
+    if args.metrics and args.metrics_fd == 1 and output == "-":
+        parser.error("--metrics-fd 1 would mix metrics into the data on "
+                     "stdout")
+    if args.straddle is not None and args.straddle < MIN_STRADDLE:
+        parser.error(f"--straddle needs at least {MIN_STRADDLE} bytes")
+    if args.straddle and (compression or args.index_every):
+        parser.error("--straddle needs uncompressed output and no "
+                     "--index-every")
+    if args.golden and (args.resume or args.append is not None
+                        or output == "-" or compression
+                        or not FORMATS[args.format].get("lines")):
+        parser.error("--golden needs a new, uncompressed ndjson or csv file "
+                     "(not stdout)")
+    if args.index_every and (output == "-" or compression
+                             or not FORMATS[args.format].get("lines")):
+        parser.error("--index-every needs an uncompressed ndjson or csv "
+                     "file (not stdout)")
+    total_records = args.records if args.records is not None \
+        else TOTAL_RECORDS
+    first_id, existing_bytes = 1, 0
+    if args.append is not None and not os.path.exists(output):
+        parser.error(f"--append: {output} does not exist")
+    if args.resume or args.append is not None:
+        if os.path.exists(output):
+            try:
+                last_id, existing_bytes = find_resume_point(
+                    output, args.format, schema,
+                    format_header(args.format, schema))
+            except ResumeError as e:
+                parser.error(str(e))
+            first_id = last_id + 1
+        if args.append is not None:
+            total_records = first_id - 1 + args.append
+
+    max_bytes = None
+    if args.target_bytes is not None and schema:
+        # record sizes depend on the schema's random values: generate up to
+        # the most records that could fit and cut at the budget
+        encode, header = compiled(schema_text(schema), args.format)
+        max_bytes = args.target_bytes
+        total_records = max(0, max_bytes - len(header)) \
+            // min_record_length(encode)
+    elif args.target_bytes is not None and padded:
+        encode = padded_encoder(sizes_text(args.record_sizes or {
+            "distribution": "fixed", "min": 0, "max": 0}))
+        max_bytes = args.target_bytes
+        total_records = max_bytes // encode.min_length
+    elif args.target_bytes is not None:
+        total_records = records_for_bytes(args.format, args.target_bytes,
+                                          BLOCK_RECORDS)
+    if checkpoint and checkpoint.get("max_bytes") != max_bytes:
+        parser.error(f"--resume: the byte budget of {output} "
+                     f"({checkpoint.get('max_bytes')}) does not match this "
+                     f"run ({max_bytes})")
 
-start_time = datetime(2025, 1, 1)
+    options = dict(workers=workers, compression=compression,
+                   level=args.level, manifest=args.manifest or None,
+                   schema=schema, max_bytes=max_bytes,
+                   encoder="json" if args.encoder == "json" else None,
+                   background=args.background_writer,
+                   preallocate_file=args.preallocate,
+                   record_sizes=args.record_sizes, straddle=args.straddle)
+    use_cache = args.cache and output != "-" and not args.index_every \
+        and not args.golden and first_id == 1 and not existing_bytes
 
-with open(OUTPUT_FILE, "w", encoding="utf-8") as f:
-    for i in range(1, TOTAL_RECORDS + 1):
-        record = {
-            "id": i,
-            "username": f"user_{i}",
-            "email": f"user_{i}@example.com",
-            "isActive": i % 2 == 0,
-            "createdAt": (start_time + timedelta(seconds=i)).isoformat() + "Z"
-        }
+    started = time.perf_counter()
+    try:
+        if use_cache:
+            stats = generate_cached(FixtureCache(args.cache,
+                                                 args.cache_budget),
+                                    output, total_records, args.format,
+                                    **options)
+        else:
+            stats = generate(output, total_records, args.format,
+                             index_every=args.index_every,
+                             golden=args.golden,
+                             metrics_interval=args.metrics,
+                             metrics_fd=args.metrics_fd,
+                             target_bytes=args.target_bytes,
+                             first_id=first_id,
+                             existing_bytes=existing_bytes, **options)
+    except BrokenPipeError:
+        # reader went away (e.g. `| head`); silence the flush at exit
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(1)
+    report(stats, time.perf_counter() - started, output)
 
-        f.write(json.dumps(record) + "\n")
 
-print(f"Generated {TOTAL_RECORDS} records in {OUTPUT_FILE}")
+if __name__ == "__main__":
+    main()